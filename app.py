@@ -1,38 +1,74 @@
+import copy
+import gc
+import gzip
+import hashlib
+import hmac
+import json
 import logging
-import logging.config
 import os
 import random
-
-from flask import Flask, flash, redirect, render_template, request, url_for
-
-# Logging configuration: send logs to the console only.
-logging_config = {
-    "version": 1,
-    "disable_existing_loggers": False,
-    "formatters": {
-        "standard": {
-            "format": "[%(asctime)s] %(levelname)s in %(module)s: %(message)s"
-        },
-    },
-    "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "standard",
-            "level": "DEBUG",
-        },
-    },
-    "root": {
-        "handlers": ["console"],
-        "level": "DEBUG",
-    },
-}
-
-logging.config.dictConfig(logging_config)
+import threading
+import time
+import weakref
+from array import array
+from collections import namedtuple
+from types import MappingProxyType
+
+from flask import (
+    Flask,
+    Response,
+    abort,
+    before_render_template,
+    flash,
+    g,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    send_file,
+    session,
+    stream_with_context,
+    template_rendered,
+    url_for,
+)
+from markupsafe import Markup
+
+try:
+    import yaml
+except ImportError:  # YAML layouts are optional
+    yaml = None
+
+try:
+    import brotli
+except ImportError:  # pages fall back to gzip
+    brotli = None
+
+from assets import IMMUTABLE, AssetManifest
+from history import (
+    TURN_LOSES_NEXT,
+    TURN_RESHUFFLED,
+    TURN_SHORTCUT,
+    TURN_SKIPPED,
+    TURN_WON,
+    TurnHistory,
+    TurnRecord,
+)
+from logging_setup import TURN_LOGGER, configure_logging
+from metrics import TURN_BUCKETS, MetricsRegistry
+from persistence import GameStore
+from registry import GameRegistry
+from statestore import MemoryStateStore, SQLiteStateStore, VersionConflict
+
+_import_started = time.perf_counter()  # start of the module body, after imports
+
+# Logging is configured by create_app; console only, driven by the environment.
 logger = logging.getLogger(__name__)
-logger.debug("Logging configuration loaded.")
+turn_logger = logging.getLogger(TURN_LOGGER)
 
 app = Flask(__name__)
-app.secret_key = "candyland-secret-key"  # for flash messages
+app.secret_key = os.environ.get(
+    "CANDYLAND_SECRET_KEY", "candyland-secret-key"
+)  # for flash messages
 
 # ---------- Game Models and Logic ----------
 
@@ -59,6 +95,20 @@ PICTURE_IMAGES = {
 
 
 class Square:
+    __slots__ = (
+        "index",
+        "color",
+        "is_start",
+        "is_finish",
+        "is_picture",
+        "picture_name",
+        "is_shortcut_start",
+        "shortcut_target",
+        "is_lose_turn",
+        "image_filename",
+        "_frozen",
+    )
+
     def __init__(
         self,
         index,
@@ -83,14 +133,141 @@ class Square:
         self.is_lose_turn = is_lose_turn
         self.image_filename = image_filename
 
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"Square {self.index} is frozen")
+        object.__setattr__(self, name, value)
+
+    def freeze(self):
+        object.__setattr__(self, "_frozen", True)
+
+
+# The built-in layout. Other layouts are loaded from BOARDS_DIR; see
+# load_layouts for the format.
+CLASSIC_LAYOUT = {
+    "name": "classic",
+    "squares": 134,
+    "colors": COLORS,
+    "pictures": [
+        {"square": 10, "name": "Peppermint Forest"},
+        {"square": 30, "name": "Gumdrop Mountain"},
+        {"square": 60, "name": "Lollipop Woods"},
+        {"square": 90, "name": "Ice Cream Sea"},
+        {"square": 110, "name": "Gingerbread Tree"},
+        {"square": 120, "name": "Gloppy the Molasses Monster"},
+    ],
+    "shortcuts": [[50, 70]],
+    "lose_turn": [120],
+    "deck": {"singles": 6, "doubles": 2, "pictures": PICTURE_CARDS},
+}
 
-class Board:
-    def __init__(self):
-        self.spaces = self.generate_board()
+LAYOUT_KEYS = {"name", "squares", "colors", "pictures", "shortcuts", "lose_turn"}
+LAYOUT_KEYS |= {"deck", "images"}
+MAX_DECK_SIZE = 255  # card codes are stored in a bytearray
+
+
+def layout_digest(definition):
+    canonical = json.dumps(definition, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def validate_layout(definition):
+    # Raises ValueError describing the first problem found.
+    name = definition.get("name") if isinstance(definition, dict) else None
+
+    def check(condition, message):
+        if not condition:
+            raise ValueError(f"Board layout {name!r}: {message}")
+
+    check(isinstance(definition, dict), "must be a mapping")
+    unknown = set(definition) - LAYOUT_KEYS
+    check(not unknown, f"unknown keys {sorted(map(str, unknown))}")
+    check(isinstance(name, str), "name must be a string")
+    total = definition.get("squares")
+    check(isinstance(total, int) and 3 <= total <= 65535, "squares must be 3-65535")
+    inner = range(1, total - 1)  # neither start nor finish
+    colors = definition.get("colors")
+    check(
+        isinstance(colors, list)
+        and colors
+        and all(isinstance(color, str) for color in colors)
+        and len(set(colors)) == len(colors),
+        "colors must be a list of distinct names",
+    )
+    for key in ("pictures", "shortcuts", "lose_turn"):
+        check(isinstance(definition.get(key, []), list), f"{key} must be a list")
+
+    pictures = {}
+    for picture in definition.get("pictures", []):
+        check(
+            isinstance(picture, dict)
+            and picture.get("square") in inner
+            and isinstance(picture.get("name"), str),
+            f"picture {picture} needs a square and a name",
+        )
+        check(picture["square"] not in pictures, f"two pictures on {picture['square']}")
+        pictures[picture["square"]] = picture.get("name")
+    check(len(set(pictures.values())) == len(pictures), "picture names must differ")
+
+    starts = set()
+    for shortcut in definition.get("shortcuts", []):
+        check(
+            isinstance(shortcut, list)
+            and len(shortcut) == 2
+            and shortcut[0] in inner
+            and shortcut[1] in range(1, total),
+            f"shortcut {shortcut} is invalid",
+        )
+        check(shortcut[0] not in starts, f"two shortcuts from {shortcut[0]}")
+        starts.add(shortcut[0])
+    for _, end in definition.get("shortcuts", []):
+        check(end not in starts, f"shortcut to {end} would chain into another")
+    for square in definition.get("lose_turn", []):
+        check(square in inner, f"lose-turn square {square} is invalid")
+
+    deck = definition.get("deck", {})
+    check(isinstance(deck, dict), "deck must be a mapping")
+    size = 0
+    for kind in ("singles", "doubles"):
+        counts = deck.get(kind, 0)
+        if isinstance(counts, int):
+            counts = dict.fromkeys(colors, counts)
+        check(isinstance(counts, dict), f"deck {kind} must be a count or mapping")
+        check(set(counts) <= set(colors), f"deck {kind} use unknown colors")
+        check(
+            all(isinstance(n, int) and n >= 0 for n in counts.values()),
+            f"deck {kind} counts must be whole numbers",
+        )
+        size += sum(counts.values())
+    # Only colour cards move a pawn towards the finish.
+    check(size > 0, "deck needs at least one single or double card")
+    check(isinstance(deck.get("pictures", []), list), "deck pictures must be a list")
+    for card in deck.get("pictures", []):
+        check(card in pictures.values(), f"picture card {card!r} has no square")
+        size += 1
+    check(0 < size <= MAX_DECK_SIZE, f"deck must hold 1-{MAX_DECK_SIZE} cards")
+    check(isinstance(definition.get("images", {}), dict), "images must be a mapping")
 
-    def generate_board(self):
+
+class Board:
+    def __init__(self, definition=None):
+        # Board() builds the classic layout; compile_layout caches by content.
+        definition = definition if definition is not None else CLASSIC_LAYOUT
+        self.name = definition["name"]
+        self.digest = layout_digest(definition)
+        self.layout_id = self.digest[:16]
+        self.colors = tuple(definition["colors"])
+        self.spaces = tuple(self.generate_board(definition))
+        for square in self.spaces:
+            square.freeze()
+        self.cards = build_card_table(definition)
+        self.color_jumps = self.build_color_jumps()
+        self.picture_index = self.build_picture_index()
+
+    def generate_board(self, definition):
         board = []
-        total_spaces = 134
+        total_spaces = definition["squares"]
+        images = {**PICTURE_IMAGES, **definition.get("images", {})}
 
         # Create basic board with repeating colors
         for i in range(total_spaces):
@@ -100,45 +277,60 @@ class Board:
                 # Assign finish square image and name
                 board.append(Square(
                     i,
-                    color="red",
+                    color=self.colors[0],
                     is_finish=True,
                     is_picture=True,
                     picture_name="Candy Castle",
-                    image_filename=PICTURE_IMAGES.get("Candy Castle"),
+                    image_filename=images.get("Candy Castle"),
                 ))
             else:
-                color = COLORS[(i - 1) % len(COLORS)]
+                color = self.colors[(i - 1) % len(self.colors)]
                 board.append(Square(i, color=color))
 
-        # Mark picture spaces at fixed indices:
-        picture_positions = {
-            10: "Peppermint Forest",
-            30: "Gumdrop Mountain",
-            60: "Lollipop Woods",
-            90: "Ice Cream Sea",
-            110: "Gingerbread Tree",
-            120: "Gloppy the Molasses Monster",  # Also the lose-turn square
-        }
-        for pos, name in picture_positions.items():
-            if pos < total_spaces:
-                image_file = PICTURE_IMAGES.get(name)
-                board[pos].is_picture = True
-                board[pos].picture_name = name
-                board[pos].image_filename = image_file
-                if name == "Gloppy the Molasses Monster":
-                    board[pos].is_lose_turn = True
-
-        # Example shortcut: if a player lands exactly on space 50, move to space 70.
-        shortcut_start = 50
-        shortcut_end = 70
-        if shortcut_start < total_spaces and shortcut_end < total_spaces:
-            board[shortcut_start].is_shortcut_start = True
-            board[shortcut_start].shortcut_target = shortcut_end
+        for picture in definition.get("pictures", []):
+            square = board[picture["square"]]
+            square.is_picture = True
+            square.picture_name = picture["name"]
+            square.image_filename = images.get(picture["name"])
+        for square in definition.get("lose_turn", []):
+            board[square].is_lose_turn = True
+        for start, end in definition.get("shortcuts", []):
+            board[start].is_shortcut_start = True
+            board[start].shortcut_target = end
 
         return board
 
+    def build_color_jumps(self, max_steps=2):
+        # color_jumps[color][n - 1][pos] is the index of the n-th square of
+        # `color` after `pos`, or the finish square if there are fewer than n.
+        # The finish square never counts as a color match.
+        finish = self.spaces[-1].index
+        jumps = {}
+        for color in self.colors:
+            nearest = [finish] * len(self.spaces)
+            next_pos = finish
+            for pos in range(len(self.spaces) - 1, -1, -1):
+                nearest[pos] = next_pos
+                square = self.spaces[pos]
+                if not square.is_finish and square.color == color:
+                    next_pos = pos
+            steps = [tuple(nearest)]
+            for _ in range(1, max_steps):
+                steps.append(tuple(nearest[p] for p in steps[-1]))
+            jumps[color] = tuple(steps)
+        return MappingProxyType(jumps)
+
+    def build_picture_index(self):
+        index = {}
+        for square in self.spaces:
+            if square.is_picture and square.picture_name not in index:
+                index[square.picture_name] = square.index
+        return MappingProxyType(index)
+
 
 class Card:
+    __slots__ = ("card_type", "value", "image_filename")
+
     def __init__(self, card_type, value, image_filename=None):
         self.card_type = card_type  # 'single', 'double', or 'picture'
         self.value = value
@@ -161,41 +353,146 @@ class Card:
             return f"Picture: {self.value}"
 
 
+def build_card_table(definition=None):
+    definition = definition if definition is not None else CLASSIC_LAYOUT
+    deck = definition.get("deck", {})
+    images = {**PICTURE_IMAGES, **definition.get("images", {})}
+    cards = []
+    for card_type, key in (("single", "singles"), ("double", "doubles")):
+        counts = deck.get(key, 0)
+        for color in definition["colors"]:
+            count = counts if isinstance(counts, int) else counts.get(color, 0)
+            for _ in range(count):
+                cards.append(Card(card_type, color))
+    for picture_name in deck.get("pictures", []):
+        # Get the corresponding image filename from the dictionary
+        image_file = images.get(picture_name)
+        # Create the card WITH the image filename
+        cards.append(Card("picture", picture_name, image_filename=image_file))
+    # Classic total: 6*6 + 2*6 + 6 = 54
+    return tuple(cards)
+
+
+_layouts = {}  # digest -> compiled Board
+_layouts_lock = threading.Lock()
+
+
+def compile_layout(definition):
+    # Validates a layout definition and builds its Board once; the same
+    # content always returns the same shared, frozen Board.
+    validate_layout(definition)
+    digest = layout_digest(definition)
+    with _layouts_lock:
+        board = _layouts.get(digest)
+        if board is None:
+            board = _layouts[digest] = Board(definition)
+            logger.debug("Compiled board layout %s (%s).", board.name, digest[:16])
+    return board
+
+
+def compiled_layouts():
+    # layout_id -> Board for every layout compiled so far.
+    with _layouts_lock:
+        return {board.layout_id: board for board in _layouts.values()}
+
+
+def load_layout(path):
+    # Reads a JSON or, when PyYAML is installed, YAML layout definition.
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ValueError(f"{path}: PyYAML is needed for YAML layouts")
+            try:
+                definition = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f"{path}: {e}") from e
+        else:
+            definition = json.load(f)
+    return compile_layout(definition)
+
+
+def load_layouts(folder):
+    # name -> Board for the classic layout plus every file in `folder`.
+    layouts = {DEFAULT_BOARD.name: DEFAULT_BOARD}
+    if folder and os.path.isdir(folder):
+        for filename in sorted(os.listdir(folder)):
+            if not filename.endswith((".json", ".yaml", ".yml")):
+                continue
+            try:
+                board = load_layout(os.path.join(folder, filename))
+            except (OSError, ValueError) as e:
+                logger.error("Skipping board layout %s: %s", filename, e)
+                continue
+            layouts[board.name] = board
+    logger.info("Loaded board layouts: %s", ", ".join(layouts))
+    return layouts
+
+
+# Every game shares this layout unless it is given a board of its own.
+DEFAULT_BOARD = compile_layout(CLASSIC_LAYOUT)
+
+# A card code is an index into a board's card table; these instances are
+# shared by every deck on the classic layout.
+CARDS = DEFAULT_BOARD.cards
+
+
 class Deck:
-    def __init__(self):
-        self.cards = []
-        self.draw_pile = []
-        self.discard_pile = []
+    def __init__(self, rng=None, cards=None):
+        self.cards = cards if cards is not None else CARDS
+        self.rng = rng if rng is not None else random.Random()
+        self.order = bytearray()
+        self.cursor = 0
+        self.shuffles = 0
+        self._frozen = None  # (order bytes, RNG state) since the last shuffle
         self.build_deck()
         self.shuffle()
 
     def build_deck(self):
-        for color in COLORS:
-            for _ in range(6):
-                self.draw_pile.append(Card("single", color))
-        for color in COLORS:
-            for _ in range(2):
-                self.draw_pile.append(Card("double", color))
-        for picture_name in PICTURE_CARDS:
-            # Get the corresponding image filename from the dictionary
-            image_file = PICTURE_IMAGES.get(picture_name)
-            # Create the card WITH the image filename
-            self.draw_pile.append(
-                Card("picture", picture_name, image_filename=image_file)
-            )
-        # Total cards: 6*6 + 2*6 + 6 = 54
+        self.order[:] = range(len(self.cards))
+        self.cursor = 0
 
     def shuffle(self):
-        random.shuffle(self.draw_pile)
+        # Shuffles the whole deck in place; every card is back in play.
+        self.rng.shuffle(self.order)
+        self.cursor = 0
+        self.shuffles += 1
+        self._frozen = None
+
+    def frozen(self):
+        # The order and RNG state only change on a shuffle, so every
+        # snapshot taken between two shuffles shares one immutable copy.
+        if self._frozen is None:
+            self._frozen = (bytes(self.order), self.rng.getstate())
+        return self._frozen
+
+    def restore(self, frozen, cursor, shuffles):
+        order, rng_state = frozen
+        self.order[:] = order
+        self.rng.setstate(rng_state)
+        self.cursor = cursor
+        self.shuffles = shuffles
+        self._frozen = frozen
+
+    def stack(self, code):
+        # Moves card `code` up from later in the deck so it is drawn next;
+        # raises ValueError if every copy of it has already been drawn.
+        if self.cursor == len(self.order):
+            self.shuffle()
+        found = self.order.find(code, self.cursor)
+        if found < 0:
+            raise ValueError(f"{self.cards[code]!r} is not left in the deck.")
+        self.order[self.cursor], self.order[found] = code, self.order[self.cursor]
+        self._frozen = None
+
+    def draw_code(self):
+        if self.cursor == len(self.order):
+            self.shuffle()
+        code = self.order[self.cursor]
+        self.cursor += 1
+        return code
 
     def draw(self):
-        if not self.draw_pile:
-            self.draw_pile = self.discard_pile.copy()
-            self.discard_pile = []
-            self.shuffle()
-        card = self.draw_pile.pop(0)
-        self.discard_pile.append(card)
-        return card
+        return self.cards[self.draw_code()]
 
 
 class Player:
@@ -207,21 +504,312 @@ class Player:
         self.skip_turn = False
 
 
+GameEvent = namedtuple(
+    "GameEvent",
+    ["seq", "kind", "text", "player", "card", "from_square", "to_square"],
+    defaults=(None, None, None, None),
+)
+
+
+class EventLog:
+    """Bounded log of the most recent game events.
+
+    Turn events are kept as integer codes into the game's turn history
+    (record index * 8 + the event's position among that record's events)
+    and rendered by `render` only when they are read; other events are kept
+    as GameEvents. Sequence numbers are contiguous.
+    """
+
+    def __init__(self, capacity=500, render=None):
+        self.capacity = capacity
+        self.render = render  # (record index, position) -> (kind, text, fields)
+        # One code per event, -1 for those kept in _plain. Trimmed to the
+        # newest `capacity` once it holds twice that many.
+        self._codes = array("q")
+        self._plain = {}  # seq -> GameEvent
+        self._first_seq = 0  # seq of _codes[0]
+        self.next_seq = 0
+
+    def __len__(self):
+        return min(len(self._codes), self.capacity)
+
+    def __iter__(self):
+        return iter(self._events(self.next_seq - len(self), self.next_seq))
+
+    def append(self, kind, text, **fields):
+        event = GameEvent(self.next_seq, kind, text, **fields)
+        self._plain[event.seq] = event
+        self._push(-1)
+        return event
+
+    def append_turn(self, index, position):
+        # The event at `position` among those history record `index` stands for.
+        self._push(index * 8 + position)
+
+    def _push(self, code):
+        self._codes.append(code)
+        self.next_seq += 1
+        if len(self._codes) >= 2 * self.capacity:
+            drop = len(self._codes) - self.capacity
+            del self._codes[:drop]
+            self._first_seq += drop
+            self._plain = {
+                seq: event
+                for seq, event in self._plain.items()
+                if seq >= self._first_seq
+            }
+
+    def _events(self, start, stop):
+        events = []
+        for seq in range(start, stop):
+            code = self._codes[seq - self._first_seq]
+            if code < 0:
+                events.append(self._plain[seq])
+            else:
+                kind, text, fields = self.render(code >> 3, code & 7)
+                events.append(GameEvent(seq, kind, text, **fields))
+        return events
+
+    def detach(self, index):
+        # Renders retained events of history records from `index` on, so they
+        # survive the history being rewound and rewritten past that point.
+        # Turn codes only grow, so the scan stops at the first older record.
+        for seq in range(self.next_seq - 1, self.next_seq - len(self) - 1, -1):
+            code = self._codes[seq - self._first_seq]
+            if code < 0:
+                continue
+            if code >> 3 < index:
+                break
+            (self._plain[seq],) = self._events(seq, seq + 1)
+            self._codes[seq - self._first_seq] = -1
+
+    def recent(self, count):
+        return self._events(self.next_seq - min(count, len(self)), self.next_seq)
+
+    def since(self, seq):
+        # Retained events with a sequence number of at least `seq`.
+        return self._events(max(seq, self.next_seq - len(self)), self.next_seq)
+
+    def page(self, before=None, limit=20):
+        # Returns up to `limit` events older than seq `before` (oldest first)
+        # and the cursor for the page before them, or None at the start.
+        if not len(self):
+            return [], None
+        first_seq = self.next_seq - len(self)
+        if before is None or before > self.next_seq:
+            before = self.next_seq
+        stop = max(before, first_seq)
+        start = max(stop - limit, first_seq)
+        page = self._events(start, stop)
+        next_before = page[0].seq if page and start > first_seq else None
+        return page, next_before
+
+
+# The mutable part of a Game at one moment. Everything else (board, card
+# table, players' names, the history prefix) is shared with the game.
+GameSnapshot = namedtuple(
+    "GameSnapshot",
+    [
+        "seed",
+        "turn_count",
+        "status",
+        "current_player",
+        "winner",  # player index or None
+        "last_card_code",
+        "last_turn",
+        "positions",  # tuple, one per player
+        "skip_flags",  # bytes, one per player
+        "deck",  # Deck.frozen()
+        "deck_cursor",
+        "deck_shuffles",
+        "history",  # the game's TurnHistory when the snapshot was taken
+        "history_length",
+    ],
+)
+
+
 class Game:
-    def __init__(self, num_players, names):
+    def __init__(self, num_players, names, board=None, seed=None):
         logger.info("Initializing game with %s players.", num_players)
         self.status = "Setup"
-        self.board = Board()
-        self.deck = Deck()
+        self.board = board if board is not None else DEFAULT_BOARD
+        # The seed alone determines every shuffle, so a game can be replayed
+        # from its seed and turn count.
+        self.seed = seed if seed is not None else random.getrandbits(63)
+        self.deck = Deck(random.Random(self.seed), self.board.cards)
         self.players = []
         self.current_player_index = 0
         self.winner = None
         self.init_players(num_players, names)
         self.status = "InProgress"
-        self.messages = []
-        self.last_card = None  # Initialize the last drawn card attribute
+        self.events = EventLog(render=self.render_event)
+        self.last_card_code = None  # Code of the last drawn card, if any
+        self.turn_count = 0  # play_turn calls so far
+        # Bumped by every change to the game (play_turn, restore), so
+        # equal versions mean an unchanged game; never goes backwards.
+        self.version = 0
+        self.last_turn = None  # TurnRecord of the latest play_turn call
+        # Every turn played or lost since the game was created or restored.
+        self.history = TurnHistory()
+        # Game itself is not thread-safe: request handlers hold this while
+        # they read or change the game, so one game's turns run one at a
+        # time while different games proceed in parallel.
+        self.lock = threading.RLock()
         logger.debug("Game initialized: %s", self)
 
+    @classmethod
+    def replay(cls, names, seed, turns, board=None):
+        # Rebuilds the game as it stood after `turns` play_turn calls.
+        game = cls(len(names), names, board, seed=seed)
+        while game.turn_count < turns and game.status != "Finished":
+            game.play_turn(quiet=True)
+        return game
+
+    def snapshot(self):
+        # Cheap enough to take before every turn; see restore and branch.
+        return GameSnapshot(
+            self.seed,
+            self.turn_count,
+            self.status,
+            self.current_player_index,
+            self.players.index(self.winner) if self.winner else None,
+            self.last_card_code,
+            self.last_turn,
+            tuple(player.position for player in self.players),
+            bytes(player.skip_turn for player in self.players),
+            self.deck.frozen(),
+            self.deck.cursor,
+            self.deck.shuffles,
+            self.history,
+            len(self.history),
+        )
+
+    def restore(self, snapshot):
+        # Rewinds (or fast-forwards) this game to `snapshot`, which must
+        # come from this game or one of its branches.
+        if snapshot.seed != self.seed or len(snapshot.positions) != len(self.players):
+            raise ValueError("Snapshot belongs to a different game.")
+        self.events.detach(snapshot.history_length)
+        self.turn_count = snapshot.turn_count
+        self.status = snapshot.status
+        self.current_player_index = snapshot.current_player
+        for player, position, skip_turn in zip(
+            self.players, snapshot.positions, snapshot.skip_flags
+        ):
+            player.position = position
+            player.skip_turn = bool(skip_turn)
+        self.winner = (
+            self.players[snapshot.winner] if snapshot.winner is not None else None
+        )
+        self.last_card_code = snapshot.last_card_code
+        self.last_turn = snapshot.last_turn
+        self.deck.restore(snapshot.deck, snapshot.deck_cursor, snapshot.deck_shuffles)
+        self.version += 1
+        # Histories are append-only, so the snapshot's prefix is intact; it
+        # is copied here because this game is about to write past it.
+        self.history = snapshot.history[: snapshot.history_length]
+
+    def branch(self, snapshot=None, next_card=None):
+        # An independent game from `snapshot` (default: now) for what-if
+        # play. It shares the board and card table and starts a new event log.
+        # With next_card (a card code), its next turn draws that card.
+        game = copy.copy(self)
+        game.players = [copy.copy(player) for player in self.players]
+        game.deck = copy.copy(self.deck)
+        game.deck.order = bytearray()
+        game.deck.rng = random.Random(0)  # restore sets its state
+        game.events = EventLog(render=game.render_event)
+        game.lock = threading.RLock()
+        game.restore(snapshot if snapshot is not None else self.snapshot())
+        if next_card is not None:
+            game.deck.stack(next_card)
+        return game
+
+    @property
+    def messages(self):
+        return self.turn_messages()
+
+    def turn_messages(self, start=0, stop=None):
+        # Text for history records start..stop, rendered on demand.
+        return [
+            text
+            for record in self.history[start:stop]
+            for _, text, _ in self.turn_events(record)
+        ]
+
+    def turn_events(self, record):
+        # Yields (kind, text, fields) for each event a history record stands for.
+        for kind in self.turn_kinds(record):
+            yield self.turn_event(record, kind)
+
+    def turn_kinds(self, record):
+        # The kinds of event a history record stands for, without their text.
+        if record.flags & TURN_SKIPPED:
+            return ("skip",)
+        if record.card is None:
+            return ()
+        card = self.deck.cards[record.card]
+        if self.card_target(record.from_square, card) is None:
+            return ("draw", "error")
+        kinds = ["draw", "move"]
+        if record.flags & TURN_SHORTCUT:
+            kinds.append("shortcut")
+        if record.flags & TURN_LOSES_NEXT:
+            kinds.append("lose_turn")
+        if record.flags & TURN_WON:
+            kinds.append("win")
+        return tuple(kinds)
+
+    def turn_event(self, record, kind):
+        # (kind, text, fields) for one of turn_kinds(record).
+        name = self.players[record.player].name
+        if kind == "skip":
+            return kind, f"Player {name} loses a turn.", {"player": name}
+        if kind == "win":
+            return kind, f"{name} reached Candy Castle and wins!", {"player": name}
+        if kind == "lose_turn":
+            square = self.board.spaces[record.to_square]
+            where = square.picture_name or f"square {square.index}"
+            text = f"{name} landed on {where}! Lose next turn."
+            return kind, text, {"player": name, "to_square": record.to_square}
+        card = self.deck.cards[record.card]
+        if kind == "draw":
+            return kind, f"{name} drew: {card}.", {"player": name, "card": str(card)}
+        if kind == "error":
+            text = f"{name} drew {card}, but no valid move found."
+            return kind, text, {"player": name, "card": str(card)}
+        landing = self.card_target(record.from_square, card)
+        if kind == "move":
+            text = f"{name} drew {card}. Moves from {record.from_square} to {landing}."
+            fields = {"player": name, "card": str(card)}
+            fields.update(from_square=record.from_square, to_square=landing)
+            return kind, text, fields
+        target = self.board.spaces[landing].shortcut_target
+        text = f"{name} took shortcut from {landing} to {target}!"
+        return kind, text, {"player": name, "from_square": landing, "to_square": target}
+
+    def render_event(self, index, position):
+        # Renders an EventLog code; see EventLog.append_turn.
+        record = self.history[index]
+        return self.turn_event(record, self.turn_kinds(record)[position])
+
+    def record_turn(self, record, quiet=False):
+        # Appends to the history and, unless quiet, to the event log; a win
+        # is announced either way. The log renders its text when read.
+        index = len(self.history)
+        self.history.append(record)
+        if not quiet:
+            for position in range(len(self.turn_kinds(record))):
+                self.events.append_turn(index, position)
+        elif record.flags & TURN_WON:
+            self.events.append_turn(index, len(self.turn_kinds(record)) - 1)
+
+    @property
+    def last_card(self):
+        if self.last_card_code is None:
+            return None
+        return self.deck.cards[self.last_card_code]
+
     def init_players(self, num_players, names):
         pawn_colors = ["#FF0000", "#0000FF", "#FFFF00", "#008000", "#FFA500", "#800080"]
         for i in range(num_players):
@@ -233,132 +821,449 @@ class Game:
     def get_current_player(self):
         return self.players[self.current_player_index]
 
-    def advance_turn(self):
+    def advance_turn(self, quiet=False):
         next_player_index = (self.current_player_index + 1) % len(self.players)
         while self.players[next_player_index].skip_turn:
-            self.messages.append(
-                f"Player {self.players[next_player_index].name} loses a turn."
+            skipped = self.players[next_player_index]
+            self.record_turn(
+                TurnRecord(
+                    next_player_index,
+                    None,
+                    skipped.position,
+                    skipped.position,
+                    TURN_SKIPPED,
+                ),
+                quiet,
             )
-            logger.info("Player %s loses a turn.", self.players[next_player_index].name)
+            if not quiet:
+                logger.debug(
+                    "Player %s loses a turn.", self.players[next_player_index].name
+                )
             self.players[next_player_index].skip_turn = False  # Reset skip flag
             next_player_index = (next_player_index + 1) % len(self.players)
             if (
                 next_player_index == self.current_player_index
                 and self.players[next_player_index].skip_turn
             ):
-                self.messages.append(
-                    "All players skipping turn? Resetting skip for current player."
-                )
-                logger.warning(
-                    "All players skipping turn; resetting skip for %s",
-                    self.players[next_player_index].name,
-                )
+                if not quiet:
+                    self.events.append(
+                        "skip_reset",
+                        "All players skipping turn? Resetting skip for current player.",
+                        player=self.players[next_player_index].name,
+                    )
+                    logger.warning(
+                        "All players skipping turn; resetting skip for %s",
+                        self.players[next_player_index].name,
+                    )
                 self.players[next_player_index].skip_turn = False
         self.current_player_index = next_player_index
-        logger.info(
-            "Advanced turn. New current player: %s", self.get_current_player().name
-        )
-
-    def move_player(self, player, card):
-        orig_position = player.position
-        new_position = orig_position
-        board = self.board.spaces
-        found_target = False
+        if not quiet:
+            logger.debug(
+                "Advanced turn. New current player: %s", self.get_current_player().name
+            )
 
+    def card_target(self, position, card):
+        # The square `card` sends a pawn on `position` to, before any
+        # shortcut, or None if the card has nowhere to go.
         if card.card_type in ["single", "double"]:
             needed = 1 if card.card_type == "single" else 2
-            found = 0
-            for pos in range(orig_position + 1, len(board)):
-                if not board[pos].is_finish and board[pos].color == card.value:
-                    found += 1
-                    if found == needed:
-                        new_position = pos
-                        found_target = True
-                        break
-            if not found_target:
-                new_position = board[-1].index
-                found_target = True
-
+            jumps = self.board.color_jumps.get(card.value)
+            if jumps is not None:
+                return jumps[needed - 1][position]
+            return self.board.spaces[-1].index
         elif card.card_type == "picture":
-            for pos in range(len(board)):
-                if board[pos].is_picture and board[pos].picture_name == card.value:
-                    new_position = pos
-                    found_target = True
-                    break
-
-        if found_target:
-            move_msg = f"{player.name} drew {card}. Moves from {orig_position} to {new_position}."
-            self.messages.append(move_msg)
-            logger.info(move_msg)
+            return self.board.picture_index.get(card.value)
+        return None
+
+    def move_player(self, player, card, quiet=False):
+        # Returns the TURN_* flags describing what happened.
+        orig_position = player.position
+        new_position = self.card_target(orig_position, card)
+        board = self.board.spaces
+        flags = 0
+
+        if new_position is not None:
+            if not quiet:
+                logger.debug(
+                    "%s moves from %s to %s.", player.name, orig_position, new_position
+                )
             player.position = new_position
 
             current_square = board[player.position]
 
             if current_square.is_shortcut_start and not current_square.is_finish:
-                shortcut_msg = f"{player.name} took shortcut from {player.position} to {current_square.shortcut_target}!"
-                self.messages.append(shortcut_msg)
-                logger.info(shortcut_msg)
+                if not quiet:
+                    logger.debug(
+                        "%s took shortcut from %s to %s.",
+                        player.name,
+                        player.position,
+                        current_square.shortcut_target,
+                    )
                 player.position = current_square.shortcut_target
                 current_square = board[player.position]
+                flags |= TURN_SHORTCUT
 
             if current_square.is_lose_turn and not current_square.is_finish:
                 player.skip_turn = True
-                lose_turn_msg = f"{player.name} landed on {current_square.picture_name}! Lose next turn."
-                self.messages.append(lose_turn_msg)
-                logger.info(lose_turn_msg)
+                flags |= TURN_LOSES_NEXT
+                if not quiet:
+                    logger.debug("%s loses next turn.", player.name)
 
             if player.position >= board[-1].index:
                 self.status = "Finished"
                 self.winner = player
-                win_msg = f"{player.name} reached Candy Castle and wins!"
-                self.messages.append(win_msg)
-                logger.info(win_msg)
-        else:
-            error_msg = f"{player.name} drew {card}, but no valid move found."
-            self.messages.append(error_msg)
-            logger.error(error_msg)
-
-    def play_turn(self):
-        self.last_card = None
+                flags |= TURN_WON
+                logger.info("%s reached Candy Castle and wins!", player.name)
+        elif not quiet:
+            logger.error("%s drew %s, but no valid move found.", player.name, card)
+        return flags
+
+    def play_turn(self, quiet=False):
+        # quiet=True skips building events and per-turn logging; the game
+        # itself advances, and its history is recorded, exactly as otherwise.
+        self.last_card_code = None
+        self.turn_count += 1
+        # advance_turn only runs from here, so this covers its changes too.
+        self.version += 1
+        player_index = self.current_player_index
         player = self.get_current_player()
-        logger.info("Player %s's turn.", player.name)
+        orig_position = player.position
+        if not quiet:
+            logger.debug("Player %s's turn.", player.name)
 
         if player.skip_turn:
-            logger.debug("Player %s is skipping the turn.", player.name)
-            self.advance_turn()
+            if not quiet:
+                logger.debug("Player %s is skipping the turn.", player.name)
+            self.last_turn = TurnRecord(
+                player_index, None, orig_position, orig_position, 0
+            )
+            self.record_turn(self.last_turn, quiet)
+            self.advance_turn(quiet)
             return None
 
-        card = self.deck.draw()
-        self.last_card = card
-        draw_msg = f"{player.name} drew: {self.last_card}."
-        self.messages.append(draw_msg)
-        logger.info(draw_msg)
-
-        self.move_player(player, card)
+        shuffles = self.deck.shuffles
+        self.last_card_code = self.deck.draw_code()
+        card = self.deck.cards[self.last_card_code]
+        flags = self.move_player(player, card, quiet)
+        if self.deck.shuffles != shuffles:
+            flags |= TURN_RESHUFFLED
+        self.last_turn = TurnRecord(
+            player_index, self.last_card_code, orig_position, player.position, flags
+        )
+        self.record_turn(self.last_turn, quiet)
 
         if self.status != "Finished":
-            self.advance_turn()
-
+            self.advance_turn(quiet)
+
+        if not quiet and turn_logger.isEnabledFor(logging.INFO):
+            # One structured record per turn; formatted only if a handler
+            # actually emits it.
+            turn_logger.info(
+                "%s drew %s: %s -> %s",
+                player.name,
+                card,
+                orig_position,
+                player.position,
+                extra={
+                    "turn": {
+                        "player": player.pid,
+                        "card": self.last_card_code,
+                        "from": orig_position,
+                        "to": player.position,
+                        "skip_turn": player.skip_turn,
+                        "status": self.status,
+                    }
+                },
+            )
         return card
 
+    def autoplay(self, max_turns=None):
+        # Plays until someone wins (or max_turns) on the quiet path and
+        # returns a compact summary of what happened.
+        turns = 0
+        cards_drawn = [0] * len(self.players)
+        while self.status != "Finished" and (max_turns is None or turns < max_turns):
+            player_index = self.current_player_index
+            if self.play_turn(quiet=True) is not None:
+                cards_drawn[player_index] += 1
+            turns += 1
+        if turns:
+            self.events.append("autoplay", f"Autoplayed {turns} turns.")
+        logger.info("Autoplayed %s turns; game is %s.", turns, self.status)
+        return {
+            "turns": turns,
+            "cards_drawn": cards_drawn,
+            "positions": [p.position for p in self.players],
+            "status": self.status,
+            "winner": self.winner.name if self.winner else None,
+        }
+
+
+# ---------- Board Layouts ----------
+
+BOARDS_DIR = os.environ.get(
+    "CANDYLAND_BOARDS", os.path.join(os.path.dirname(__file__), "boards")
+)
+# name -> compiled Board; /start only picks one of these.
+LAYOUTS = load_layouts(BOARDS_DIR)
+
+
+# ---------- Game Registry ----------
+
+registry = GameRegistry(
+    max_games=int(os.environ.get("CANDYLAND_MAX_GAMES", 1000)),
+    ttl_seconds=float(os.environ.get("CANDYLAND_GAME_TTL", 3600)),
+)
+
+# Where routes find games. The registry serves a single worker; set
+# CANDYLAND_STATE_DB to share games between worker processes instead.
+games = MemoryStateStore(registry)
+
+# Set CANDYLAND_DB to a SQLite path to keep games across restarts.
+store = None
+
+
+def open_store(path):
+    # Opens the game store and restores its recent games into the registry.
+    global store
+    store = GameStore(path, Game, boards=compiled_layouts())
+    store.purge(registry.ttl_seconds)
+    for game_id, game in store.load_all(limit=registry.max_games):
+        registry.add(game, game_id)
+    return store
+
+
+def open_shared_state(path):
+    # Switches every route to the game state shared through `path`.
+    global games
+    games = SQLiteStateStore(
+        path,
+        Game,
+        boards=compiled_layouts(),
+        cache_size=registry.max_games,
+        max_games=registry.max_games,
+        ttl_seconds=registry.ttl_seconds,
+    )
+    games.purge(registry.ttl_seconds, registry.max_games)
+    return games
+
+
+# ---------- Metrics ----------
+
+metrics = MetricsRegistry()
+request_seconds = metrics.histogram(
+    "candyland_request_seconds",
+    "Time spent handling a request, by endpoint.",
+    labelnames=("endpoint", "method"),
+)
+play_turn_seconds = metrics.histogram(
+    "candyland_play_turn_seconds",
+    "Time spent in Game.play_turn for a drawn card.",
+    buckets=TURN_BUCKETS,
+)
+render_seconds = metrics.histogram(
+    "candyland_render_template_seconds",
+    "Time spent rendering a template.",
+    labelnames=("template",),
+)
+games_started = metrics.counter(
+    "candyland_games_started_total", "Games started via /start."
+)
+turns_played = metrics.counter(
+    "candyland_turns_played_total", "Turns played, by /draw or /autoplay."
+)
+metrics.gauge("candyland_live_games", "Games in the state store.", lambda: len(games))
+metrics.gauge(
+    "candyland_startup_seconds",
+    "Time from importing app to create_app returning.",
+    lambda: app.config.get("STARTUP_TIMINGS", {}).get("total", 0),
+)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def observe_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        request_seconds.observe(
+            time.perf_counter() - started, request.endpoint or "none", request.method
+        )
+    return response
+
+
+@before_render_template.connect_via(app)
+def start_render_timer(sender, template, context, **extra):
+    g.setdefault("render_started", []).append(time.perf_counter())
+
+
+@template_rendered.connect_via(app)
+def observe_render(sender, template, context, **extra):
+    started = g.get("render_started")
+    if started:
+        render_seconds.observe(time.perf_counter() - started.pop(), template.name)
+
+
+# Static files get content-hashed names at startup; see asset_url.
+assets = AssetManifest(app.static_folder)
+
+
+@app.template_global()
+def asset_url(filename):
+    url_name = assets.url_name(filename)
+    if url_name is None:
+        # Added after startup: serve it unversioned from the static route.
+        return url_for("static", filename=filename)
+    return url_for("asset", filename=url_name)
+
+
+def card_image_urls():
+    return {name: asset_url(f"images/{name}") for name in PICTURE_IMAGES.values()}
+
+
+def pages_digest():
+    # Changes whenever a template or a static asset does, so a page's ETag
+    # from before a deploy never matches after it.
+    digest = hashlib.sha256()
+    for name in sorted(app.jinja_env.list_templates()):
+        source, _, _ = app.jinja_loader.get_source(app.jinja_env, name)
+        digest.update(f"{name}\0{source}\0".encode())
+    for asset in sorted(assets, key=lambda asset: asset.name):
+        digest.update(f"{asset.url_name}\0".encode())
+    return digest.hexdigest()
+
 
-# ---------- Global Game Instance ----------
+PAGES_DIGEST = pages_digest()
 
-game = None
+# Smaller pages are sent as they are; compressing them gains next to nothing.
+COMPRESS_MIN_BYTES = 1024
+
+
+def page_encoding():
+    # The content coding the current request gets for a full page.
+    if brotli is not None and "br" in request.accept_encodings:
+        return "br"
+    if "gzip" in request.accept_encodings:
+        return "gzip"
+    return None
+
+
+def page_etag(game_id, game, spectating, encoding):
+    # Strong validator for GET /game: the page is a function of the game's
+    # version (plus turn count, as restored games restart their version),
+    # who is looking and the deployed templates and assets.
+    key = f"{PAGES_DIGEST}:{game_id}:{game.version}:{game.turn_count}:{spectating}"
+    etag = hashlib.sha256(key.encode()).hexdigest()[:32]
+    return f"{etag}-{encoding}" if encoding else etag
+
+
+def compressed_page(html, encoding):
+    body = html.encode("utf-8")
+    response = Response(mimetype="text/html")
+    if encoding and len(body) >= COMPRESS_MIN_BYTES:
+        if encoding == "br":
+            body = brotli.compress(body, quality=5)
+        else:
+            body = gzip.compress(body, compresslevel=6)
+        response.headers["Content-Encoding"] = encoding
+    response.set_data(body)
+    return response
+
+
+# Idle event streams send a comment this often so proxies keep them open.
+STREAM_KEEPALIVE_SECONDS = 15
+
+
+def current_game_id(watch=False):
+    # Each browser session points at its own game in the store. Read-only
+    # routes also accept ?game_id= so spectators can follow another table.
+    if watch and "game_id" in request.args:
+        return request.args["game_id"]
+    return session.get("game_id")
+
+
+def current_game(watch=False):
+    return games.get(current_game_id(watch))
+
+
+def wants_json():
+    return request.is_json or request.accept_mimetypes.best == "application/json"
+
+
+def format_sse(event):
+    data = json.dumps(event._asdict())
+    return f"id: {event.seq}\ndata: {data}\n\n"
+
+
+# The board markup only depends on the layout, so render it once per Board.
+_board_fragments = weakref.WeakKeyDictionary()
+
+
+def board_fragment(board):
+    fragment = _board_fragments.get(board)
+    if fragment is None:
+        logger.debug("Rendering board fragment for %s squares.", len(board.spaces))
+        fragment = Markup(render_template("_board.html", board=board))
+        _board_fragments[board] = fragment
+    return fragment
+
+
+def game_state(game):
+    card = game.last_card
+    return {
+        "seed": game.seed,
+        "turn_count": game.turn_count,
+        "status": game.status,
+        "current_player": game.current_player_index,
+        "winner": game.winner.name if game.winner else None,
+        "players": [
+            {
+                "name": p.name,
+                "pawn_color": p.pawn_color,
+                "position": p.position,
+                "skip_turn": p.skip_turn,
+            }
+            for p in game.players
+        ],
+        "last_card": (
+            {
+                "card_type": card.card_type,
+                "value": card.value,
+                "image_filename": card.image_filename,
+            }
+            if card is not None
+            else None
+        ),
+    }
+
+
+# Snapshots store each name behind a one-byte length, so even four-byte
+# UTF-8 characters must fit in 255 bytes.
+MAX_NAME_LENGTH = 50
 
 
 # ---------- Flask Routes ----------
 @app.route("/", methods=["GET"])
 def setup():
     logger.debug("Setup route accessed, resetting game.")
-    global game
-    game = None
-    return render_template("index.html", template_folder=".")
+    game_id = session.pop("game_id", None)
+    if game_id is not None:
+        games.discard(game_id)
+        if store is not None:
+            store.delete(game_id)
+    return render_template(
+        "index.html",
+        layouts=LAYOUTS,
+        max_name_length=MAX_NAME_LENGTH,
+        template_folder=".",
+    )
 
 
 @app.route("/start", methods=["POST"])
 def start():
-    global game
     try:
         num_players = int(request.form.get("num_players", 0))
         if not 2 <= num_players <= 6:
@@ -374,58 +1279,531 @@ def start():
     for i in range(1, num_players + 1):
         name = request.form.get(f"player{i}", f"Player {i}").strip()
         names.append(name if name else f"Player {i}")
+    if any(len(name) > MAX_NAME_LENGTH for name in names):
+        flash(f"Player names must be at most {MAX_NAME_LENGTH} characters.", "error")
+        logger.warning("Player name too long.")
+        return redirect(url_for("setup"))
 
-    game = Game(num_players, names)
-    game.messages.append("Game started!")
-    logger.info("Game started with players: %s", names)
+    # An optional seed reproduces a game; with turns it resumes that game.
+    try:
+        seed = request.form.get("seed", "").strip()
+        seed = int(seed) if seed else None
+        turns = int(request.form.get("turns", "").strip() or 0)
+        if (seed is not None and not 0 <= seed < 2**63) or turns < 0:
+            raise ValueError("seed or turns out of range")
+    except ValueError as e:
+        flash("Invalid seed or turn count.", "error")
+        logger.error("Error parsing seed: %s", e)
+        return redirect(url_for("setup"))
+
+    board = LAYOUTS.get(request.form.get("board") or DEFAULT_BOARD.name)
+    if board is None:
+        flash("Unknown board layout.", "error")
+        logger.warning("Unknown board layout: %s", request.form.get("board"))
+        return redirect(url_for("setup"))
+
+    if turns:
+        game = Game.replay(names, seed, turns, board)
+    else:
+        game = Game(num_players, names, board, seed=seed)
+    game.events.append("start", "Game started!")
+    games_started.inc()
+    old_game_id = session.get("game_id")
+    if old_game_id is not None:
+        games.discard(old_game_id)
+        if store is not None:
+            store.delete(old_game_id)
+    session["game_id"] = games.add(game)
+    if store is not None:
+        store.save_snapshot(session["game_id"], game)
+    logger.info(
+        "Game %s started with players: %s (seed %s)",
+        session["game_id"],
+        names,
+        game.seed,
+    )
     return redirect(url_for("game_route"))
 
 
 @app.route("/game", methods=["GET"])
 def game_route():
+    game_id = current_game_id(watch=True)
+    game = games.get(game_id)
     if game is None:
         flash("Please start a new game first.", "info")
         logger.info("Game route accessed without a game; redirecting to setup.")
         return redirect(url_for("setup"))
-    logger.debug("Rendering game board for current state.")
-    return render_template("game.html", game=game, template_folder=".")
+    spectating = game_id != session.get("game_id")
+    encoding = page_encoding()
+    with game.lock:
+        etag = page_etag(game_id, game, spectating, encoding)
+        # Answered before any template work when the client's copy is current.
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            html = None
+        else:
+            logger.debug("Rendering game board for current state.")
+            html = render_template(
+                "game.html",
+                game=game,
+                game_id=game_id,
+                spectating=spectating,
+                board_html=board_fragment(game.board),
+                state=game_state(game),
+                card_images=card_image_urls(),
+                template_folder=".",
+            )
+    if html is not None:
+        response = compressed_page(html, encoding)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.update(("Cookie", "Accept-Encoding"))
+    return response
+
+
+@app.route("/game/state", methods=["GET"])
+def game_state_route():
+    game = current_game(watch=True)
+    if game is None:
+        logger.info("Game state requested without a game.")
+        return jsonify(error="No active game."), 404
+    with game.lock:
+        state = game_state(game)
+    return jsonify(state)
+
+
+@app.route("/game/events", methods=["GET"])
+def game_events():
+    game = current_game(watch=True)
+    if game is None:
+        logger.info("Event history requested without a game.")
+        return jsonify(error="No active game."), 404
+    before = request.args.get("before", type=int)
+    limit = min(max(request.args.get("limit", 20, type=int), 1), 100)
+    with game.lock:
+        events, next_before = game.events.page(before, limit)
+    return jsonify(
+        events=[event._asdict() for event in events], next_before=next_before
+    )
+
+
+@app.route("/game/history", methods=["GET"])
+def game_history():
+    # The full turn history as compact records, oldest first; text=1 adds
+    # the rendered messages for the same turns.
+    game = current_game(watch=True)
+    if game is None:
+        logger.info("Turn history requested without a game.")
+        return jsonify(error="No active game."), 404
+    start = max(request.args.get("start", 0, type=int), 0)
+    limit = min(max(request.args.get("limit", 200, type=int), 1), 1000)
+    with game.lock:
+        total = len(game.history)
+        records = list(game.history[start : start + limit])
+        messages = (
+            game.turn_messages(start, start + limit)
+            if request.args.get("text", type=int)
+            else None
+        )
+    payload = {"turns": [list(record) for record in records], "total": total}
+    if messages is not None:
+        payload["messages"] = messages
+    return jsonify(payload)
+
+
+@app.route("/game/stream", methods=["GET"])
+def game_stream():
+    game_id = current_game_id(watch=True)
+    game = games.get(game_id)
+    if game is None:
+        logger.info("Event stream requested without a game.")
+        return jsonify(error="No active game."), 404
+
+    # Resume after the last event the client saw, or start with new events.
+    last_seen = request.headers.get("Last-Event-ID", type=int)
+    if last_seen is None:
+        last_seen = request.args.get("after", type=int)
+    cursor = game.events.next_seq if last_seen is None else last_seen + 1
+    logger.debug("Streaming events for game %s from %s.", game_id, cursor)
+
+    def generate(cursor):
+        yield "retry: 3000\n\n"
+        while True:
+            # Fetched every time round: a shared store hands out a new game
+            # object whenever another worker has changed it.
+            game = games.get(game_id)
+            if game is None:
+                return
+            with game.lock:
+                events = game.events.since(cursor)
+                finished = game.status == "Finished"
+            for event in events:
+                yield format_sse(event)
+                cursor = event.seq + 1
+            if finished:
+                return
+            has_news = games.wait(
+                game_id,
+                lambda game: game.events.next_seq > cursor,
+                timeout=STREAM_KEEPALIVE_SECONDS,
+            )
+            if not has_news:
+                yield ": keep-alive\n\n"
+
+    return Response(
+        stream_with_context(generate(cursor)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.route("/draw", methods=["POST"])
 def draw():
-    global game
-    if game is None:
+    game_id = current_game_id()
+
+    def play(game):
+        # Checked inside the update so two racing draws cannot both play on
+        # after the winning turn.
+        if game.status == "Finished":
+            return None
+        logger.debug(
+            "Processing draw for current player: %s", game.get_current_player().name
+        )
+        first_seq = game.events.next_seq
+        with play_turn_seconds.time():
+            game.play_turn()
+        if store is not None:
+            store.record_turn(game_id, game)
+        # Only what changed: this turn's events and the new pawn state.
+        return game.events.since(first_seq), game_state(game)
+
+    try:
+        played = games.update(game_id, play)
+    except KeyError:
         logger.warning(
             "Draw route accessed without an active game; redirecting to setup."
         )
+        if wants_json():
+            return jsonify(error="No active game."), 404
         return redirect(url_for("setup"))
-    if game.status == "Finished":
-        flash("The game has already finished!", "info")
+    if played is None:
         logger.info("Draw attempted after game finished.")
+        if wants_json():
+            return jsonify(error="The game has already finished!"), 409
+        flash("The game has already finished!", "info")
         return redirect(url_for("game_route"))
+    events, state = played
+    turns_played.inc()
+    games.notify(game_id)
+    if wants_json():
+        return jsonify(events=[event._asdict() for event in events], state=state)
+    return redirect(url_for("game_route"))
 
-    logger.debug(
-        "Processing draw for current player: %s", game.get_current_player().name
-    )
-    game.play_turn()
+
+@app.route("/autoplay", methods=["POST"])
+def autoplay():
+    game_id = current_game_id()
+    payload = request.get_json(silent=True) or request.form
+    try:
+        max_turns = payload.get("turns")
+        max_turns = int(max_turns) if max_turns not in (None, "") else None
+    except (TypeError, ValueError) as e:
+        logger.error("Error parsing autoplay turns: %s", e)
+        return jsonify(error="turns must be an integer."), 400
+    if max_turns is not None and max_turns < 1:
+        return jsonify(error="turns must be at least 1."), 400
+
+    def play(game):
+        summary = game.autoplay(max_turns)
+        if store is not None:
+            store.save_snapshot(game_id, game)
+        return summary, game_state(game)
+
+    try:
+        summary, state = games.update(game_id, play)
+    except KeyError:
+        logger.warning("Autoplay requested without an active game.")
+        if wants_json():
+            return jsonify(error="No active game."), 404
+        return redirect(url_for("setup"))
+    turns_played.inc(amount=summary["turns"])
+    games.notify(game_id)
+    if wants_json():
+        return jsonify(summary=summary, state=state)
     return redirect(url_for("game_route"))
 
 
+# ---------- Bulk JSON API ----------
+
+# Per-request limits for automated clients.
+API_MAX_GAMES = 100
+API_MAX_TURNS = 10000
+
+
+def api_token(game_id):
+    # Proves a game was created through /api/games: browser games are only
+    # ever played by their own session, whoever else knows their id.
+    key = str(app.secret_key).encode()
+    return hmac.new(key, f"api:{game_id}".encode(), hashlib.sha256).hexdigest()
+
+
+def parse_game_spec(spec):
+    # {"players": [names], "seed": int, "board": name} -> (names, seed, board)
+    if not isinstance(spec, dict):
+        raise ValueError("each game must be an object")
+    players = spec.get("players")
+    if not isinstance(players, list) or not 2 <= len(players) <= 6:
+        raise ValueError("players must be a list of 2 to 6 names")
+    names = []
+    for i, name in enumerate(players, start=1):
+        if name is not None and not isinstance(name, str):
+            raise ValueError("player names must be strings")
+        name = (name or "").strip() or f"Player {i}"
+        if len(name) > MAX_NAME_LENGTH:
+            raise ValueError(
+                f"player names must be at most {MAX_NAME_LENGTH} characters"
+            )
+        names.append(name)
+    seed = spec.get("seed")
+    if seed is not None and (
+        not isinstance(seed, int) or isinstance(seed, bool) or not 0 <= seed < 2**63
+    ):
+        raise ValueError("seed must be an integer in [0, 2**63)")
+    board = LAYOUTS.get(spec.get("board") or DEFAULT_BOARD.name)
+    if board is None:
+        raise ValueError(f"unknown board layout {spec.get('board')!r}")
+    return names, seed, board
+
+
+def game_delta(game, first_turn):
+    # What changed since history record `first_turn`: the new turn records
+    # (player, card, from, to, flags) and the resulting compact state.
+    return {
+        "turns": [list(record) for record in game.history[first_turn:]],
+        "turn_count": game.turn_count,
+        "status": game.status,
+        "current_player": game.current_player_index,
+        "winner": game.players.index(game.winner) if game.winner else None,
+        "positions": [player.position for player in game.players],
+    }
+
+
+@app.route("/api/games", methods=["POST"])
+def api_create_games():
+    # {"games": [spec, ...]} ->
+    # {"games": [{"game_id": ..., "token": ..., "state": ...}]}
+    payload = request.get_json(silent=True)
+    specs = payload.get("games") if isinstance(payload, dict) else None
+    if not isinstance(specs, list) or not 1 <= len(specs) <= API_MAX_GAMES:
+        return jsonify(error=f"games must be a list of 1 to {API_MAX_GAMES}."), 400
+    parsed = []
+    for index, spec in enumerate(specs):
+        try:
+            parsed.append(parse_game_spec(spec))
+        except ValueError as e:
+            return jsonify(error=f"games[{index}]: {e}."), 400
+
+    created = []
+    for names, seed, board in parsed:
+        game = Game(len(names), names, board, seed=seed)
+        game.events.append("start", "Game started!")
+        game_id = games.add(game)
+        if store is not None:
+            store.save_snapshot(game_id, game)
+        created.append(
+            {"game_id": game_id, "token": api_token(game_id), "state": game_state(game)}
+        )
+    games_started.inc(amount=len(created))
+    logger.info("Created %s games through the API.", len(created))
+    return jsonify(games=created), 201
+
+
+@app.route("/api/games/turns", methods=["POST"])
+def api_play_turns():
+    # {"turns": {game_id: n, ...}, "tokens": {game_id: token, ...}} plays up
+    # to n turns in each game and returns {"games": {game_id: delta}}, using
+    # the tokens /api/games issued. Unknown, finished or not-API games get
+    # an error entry instead of failing the whole batch.
+    payload = request.get_json(silent=True)
+    requested = payload.get("turns") if isinstance(payload, dict) else None
+    tokens = payload.get("tokens") if isinstance(payload, dict) else None
+    if not isinstance(tokens, dict):
+        tokens = {}
+    if not isinstance(requested, dict) or not 1 <= len(requested) <= API_MAX_GAMES:
+        return (
+            jsonify(error=f"turns must map 1 to {API_MAX_GAMES} game ids to counts."),
+            400,
+        )
+    for game_id, count in requested.items():
+        if not isinstance(count, int) or isinstance(count, bool) or count < 1:
+            return jsonify(error=f"turns[{game_id!r}] must be at least 1."), 400
+    if sum(requested.values()) > API_MAX_TURNS:
+        return jsonify(error=f"At most {API_MAX_TURNS} turns per request."), 400
+
+    def advance(game_id, count):
+        def play(game):
+            if game.status == "Finished":
+                return 0, {"error": "The game has already finished!"}
+            first_turn = len(game.history)
+            played = 0
+            while played < count and game.status != "Finished":
+                game.play_turn(quiet=True)
+                played += 1
+            # Quiet turns add no events; this one tells watchers to refresh.
+            game.events.append("autoplay", f"Autoplayed {played} turns.")
+            if store is not None:
+                store.save_snapshot(game_id, game)
+            return played, game_delta(game, first_turn)
+
+        return play
+
+    results = {}
+    total = 0
+    for game_id, count in requested.items():
+        token = tokens.get(game_id)
+        if not isinstance(token, str) or not hmac.compare_digest(
+            token.encode(), api_token(game_id).encode()
+        ):
+            results[game_id] = {"error": "Not a game created through the API."}
+            continue
+        # One game updated at a time, so batches cannot deadlock each other.
+        try:
+            played, results[game_id] = games.update(game_id, advance(game_id, count))
+        except KeyError:
+            results[game_id] = {"error": "No such game."}
+            continue
+        except VersionConflict as e:
+            results[game_id] = {"error": str(e)}
+            continue
+        total += played
+        games.notify(game_id)
+    turns_played.inc(amount=total)
+    logger.info("Played %s turns across %s games.", total, len(requested))
+    return jsonify(games=results)
+
+
+@app.route("/assets/<path:filename>", methods=["GET"])
+def asset(filename):
+    found = assets.get(filename)
+    if found is None:
+        abort(404)
+    if found.body is None:
+        response = send_file(found.path, mimetype=found.mimetype, conditional=True)
+    elif found.gzipped is not None and "gzip" in request.accept_encodings:
+        response = Response(found.gzipped, mimetype=found.mimetype)
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(found.body, mimetype=found.mimetype)
+    if found.gzipped is not None:
+        response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = IMMUTABLE
+    return response
+
+
+@app.errorhandler(VersionConflict)
+def version_conflict(e):
+    # Another worker kept winning the race for this game; the client may retry.
+    logger.warning("%s", e)
+    if wants_json():
+        return jsonify(error="The game is busy, please try again."), 503
+    flash("The game is busy, please try again.", "info")
+    return redirect(url_for("game_route"))
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_route():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/reset", methods=["POST"])
 def reset():
-    global game
-    game = None
+    game_id = session.pop("game_id", None)
+    if game_id is not None:
+        games.discard(game_id)
+        if store is not None:
+            store.delete(game_id)
     flash("Game has been reset.", "info")
-    logger.info("Game has been reset via /reset route.")
+    logger.info("Game %s has been reset via /reset route.", game_id)
     return redirect(url_for("setup"))
 
 
+# ---------- App Factory ----------
+
+
+def warm_up():
+    # Compiles every template and renders each layout's board once, so no
+    # worker pays for them on its first request.
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    with app.test_request_context():
+        for board in LAYOUTS.values():
+            board_fragment(board)
+
+
+def create_app(config=None):
+    """Configures the app from `config` and the environment and warms it up.
+
+    `config` wins over the environment for the secret key, the boards
+    directory, the registry limits and the stores. The static asset
+    manifest and the pages digest depend only on the files shipped with
+    the app and are built at import. Meant to run once in the master of a
+    pre-forking server (see wsgi.py); workers forked afterwards share the
+    warmed state copy-on-write.
+    """
+    global BOARDS_DIR
+    timings = {"import": time.perf_counter() - _import_started}
+    started = time.perf_counter()
+    settings = {**os.environ, **(config or {})}
+    configure_logging(settings)
+    app.config.update(config or {})
+    secret_key = settings.get("SECRET_KEY") or settings.get("CANDYLAND_SECRET_KEY")
+    if secret_key:
+        app.secret_key = secret_key
+    boards_dir = settings.get("CANDYLAND_BOARDS", BOARDS_DIR)
+    if boards_dir != BOARDS_DIR:
+        BOARDS_DIR = boards_dir
+        LAYOUTS.clear()  # in place, so every reference to it sees the change
+        LAYOUTS.update(load_layouts(boards_dir))
+    registry.max_games = int(settings.get("CANDYLAND_MAX_GAMES", registry.max_games))
+    registry.ttl_seconds = float(
+        settings.get("CANDYLAND_GAME_TTL", registry.ttl_seconds)
+    )
+    if settings.get("CANDYLAND_STATE_DB"):
+        if not games.shared:
+            open_shared_state(settings["CANDYLAND_STATE_DB"])
+        if settings.get("CANDYLAND_DB"):
+            logger.warning("CANDYLAND_DB is ignored; games live in CANDYLAND_STATE_DB.")
+    elif settings.get("CANDYLAND_DB") and store is None:
+        open_store(settings["CANDYLAND_DB"])
+    timings["configure"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    warm_up()
+    timings["warm_up"] = time.perf_counter() - started
+
+    # Move everything built so far out of the collector's reach: a worker's
+    # garbage collections would otherwise touch, and so copy, these pages.
+    gc.collect()
+    gc.freeze()
+    timings["total"] = time.perf_counter() - _import_started
+    app.config["STARTUP_TIMINGS"] = timings
+    logger.info(
+        "Candyland ready in %.1f ms (import %.1f, configure %.1f, warm-up %.1f).",
+        timings["total"] * 1000,
+        timings["import"] * 1000,
+        timings["configure"] * 1000,
+        timings["warm_up"] * 1000,
+    )
+    return app
+
+
 if __name__ == "__main__":
     # Ensure the static folder exists if it doesn't
     if not os.path.exists("static/images"):
         os.makedirs("static/images", exist_ok=True)
         logger.info("Created static/images directory.")
 
+    create_app()
     logger.info("Starting Candyland app.")
     # Consider setting debug=False for production
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,107 @@
+"""Content-fingerprinted static assets.
+
+At startup every file under the static folder is hashed and given a
+versioned name, e.g. images/peppermint.3f2a1c9e0b4d.png. A versioned URL
+never changes content, so it can be cached for a year without
+revalidation. Text assets are gzipped once up front, and url(...)
+references inside CSS are rewritten to the versioned names as well.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+TEXT_TYPES = {".css", ".js", ".json", ".svg", ".txt"}
+HASH_LENGTH = 12
+
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+# path: file on disk; body/gzipped: preloaded bytes for text assets, else None
+Asset = namedtuple("Asset", ["name", "url_name", "path", "mimetype", "body", "gzipped"])
+
+
+def versioned_name(name, content):
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    root, ext = posixpath.splitext(name)
+    return f"{root}.{digest}{ext}"
+
+
+class AssetManifest:
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self._by_name = {}  # "images/peppermint.png" -> Asset
+        self._by_url_name = {}  # "images/peppermint.<hash>.png" -> Asset
+        if static_folder and os.path.isdir(static_folder):
+            self.build()
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def __iter__(self):
+        return iter(self._by_name.values())
+
+    def build(self):
+        names = []
+        for folder, _, files in os.walk(self.static_folder):
+            for filename in files:
+                path = os.path.join(folder, filename)
+                names.append(os.path.relpath(path, self.static_folder))
+        names = sorted(name.replace(os.sep, "/") for name in names)
+        # CSS last, so the files it references already have versioned names.
+        names.sort(key=lambda name: name.endswith(".css"))
+        for name in names:
+            self._add(name)
+        logger.info("Fingerprinted %s static assets.", len(self._by_name))
+
+    def _add(self, name):
+        path = os.path.join(self.static_folder, *name.split("/"))
+        ext = posixpath.splitext(name)[1].lower()
+        with open(path, "rb") as f:
+            content = f.read()
+        body = gzipped = None
+        if ext in TEXT_TYPES:
+            if ext == ".css":
+                content = self._rewrite_css(name, content.decode("utf-8")).encode()
+            body = content
+            gzipped = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(gzipped) >= len(body):
+                gzipped = None
+        mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        asset = Asset(
+            name, versioned_name(name, content), path, mimetype, body, gzipped
+        )
+        self._by_name[name] = asset
+        self._by_url_name[asset.url_name] = asset
+
+    def _rewrite_css(self, name, css):
+        folder = posixpath.dirname(name)
+
+        def replace(match):
+            quote, target = match.groups()
+            if ":" in target or target.startswith(("/", "#")):
+                return match.group(0)
+            resolved = posixpath.normpath(posixpath.join(folder, target))
+            asset = self._by_name.get(resolved)
+            if asset is None:
+                return match.group(0)
+            # Both files live under the same versioned prefix, so the
+            # relative path still resolves.
+            relative = posixpath.relpath(asset.url_name, folder or ".")
+            return f"url({quote}{relative}{quote})"
+
+        return CSS_URL.sub(replace, css)
+
+    def url_name(self, name):
+        asset = self._by_name.get(name)
+        return asset.url_name if asset else None
+
+    def get(self, url_name):
+        return self._by_url_name.get(url_name)
@@ -0,0 +1,270 @@
+"""Load generator for the browser flow: setup, start, game, draw, reset.
+
+Run from the repository root, either in-process through the Flask test
+client or over HTTP against a running server:
+
+    python -m benchmarks.load --games 200 --concurrency 16
+    python -m benchmarks.load --url http://127.0.0.1:8000 --think 0.5
+    python -m benchmarks.load --serve --concurrency 32
+
+--serve starts the app on a local port in a background thread and drives
+it over HTTP. Each simulated player plays one table at a time, the way a
+browser does: GET /, POST /start, then POST /draw and GET /game until the
+page announces a winner (or --max-turns), then POST /reset. Reports
+throughput, p50/p95/p99 latency per route and the error rate; exits with
+status 1 when the error rate is above --max-error-rate.
+"""
+
+import argparse
+import functools
+import http.cookiejar
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+from werkzeug.serving import make_server
+
+import app as candyland
+
+WIN_MARKER = b" Wins!</h2>"
+PERCENTILES = (50, 95, 99)
+
+
+class InProcessTransport:
+    """One browser session on the Flask test client."""
+
+    def __init__(self, flask_app):
+        self.client = flask_app.test_client()
+
+    def request(self, method, path, form=None):
+        response = self.client.open(path, method=method, data=form)
+        return response.status_code, response.data
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None  # report the 302 itself, as the test client does
+
+
+class HttpTransport:
+    """One browser session (its own cookie jar) against a live server."""
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            _NoRedirect(),
+        )
+
+    def request(self, method, path, form=None):
+        body = urllib.parse.urlencode(form).encode() if form is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class Recorder:
+    """Thread-safe latency samples and error counts per route."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)  # route -> [seconds]
+        self.errors = defaultdict(int)  # route -> failed requests
+        self.games = 0
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, ok):
+        with self._lock:
+            self.latencies[route].append(seconds)
+            if not ok:
+                self.errors[route] += 1
+
+    def game_finished(self):
+        with self._lock:
+            self.games += 1
+
+
+def percentile(ordered, q):
+    # Nearest-rank percentile of an already sorted list.
+    if not ordered:
+        return 0.0
+    rank = max(int(round(q / 100 * len(ordered))), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def timed(transport, recorder, route, method, path, form=None):
+    started = time.perf_counter()
+    try:
+        status, body = transport.request(method, path, form)
+    except OSError:
+        status, body = None, b""
+    # Every route in the flow answers 200 or redirects with 302.
+    ok = status in (200, 302)
+    recorder.record(route, time.perf_counter() - started, ok)
+    return status, body
+
+
+def play_table(transport, recorder, rng, players, max_turns, think):
+    def pause():
+        if think:
+            time.sleep(rng.uniform(0.5, 1.5) * think)
+
+    timed(transport, recorder, "setup", "GET", "/")
+    form = {"num_players": str(players)}
+    form.update({f"player{i}": f"Load {i}" for i in range(1, players + 1)})
+    timed(transport, recorder, "start", "POST", "/start", form)
+    status, page = timed(transport, recorder, "game_route", "GET", "/game")
+    for _ in range(max_turns):
+        if status != 200 or WIN_MARKER in page:
+            break
+        pause()
+        timed(transport, recorder, "draw", "POST", "/draw", {})
+        status, page = timed(transport, recorder, "game_route", "GET", "/game")
+    timed(transport, recorder, "reset", "POST", "/reset", {})
+    recorder.game_finished()
+
+
+def run(make_transport, games=50, concurrency=8, players=2, max_turns=300, think=0.0):
+    # Plays `games` tables on `concurrency` simulated browsers and returns
+    # the report dict.
+    recorder = Recorder()
+    remaining = iter(range(games))
+    remaining_lock = threading.Lock()
+
+    def worker(index):
+        transport = make_transport()
+        rng = random.Random(index)
+        while True:
+            with remaining_lock:
+                if next(remaining, None) is None:
+                    return
+            play_table(transport, recorder, rng, players, max_turns, think)
+
+    threads = [
+        threading.Thread(target=worker, args=(i,), daemon=True)
+        for i in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return report(recorder, time.perf_counter() - started, concurrency)
+
+
+def report(recorder, elapsed, concurrency):
+    routes = {}
+    everything = []
+    for route, samples in recorder.latencies.items():
+        ordered = sorted(samples)
+        everything.extend(ordered)
+        routes[route] = summarize(ordered, recorder.errors[route], elapsed)
+    everything.sort()
+    total = summarize(everything, sum(recorder.errors.values()), elapsed)
+    return {
+        "elapsed": elapsed,
+        "concurrency": concurrency,
+        "games": recorder.games,
+        "games_per_second": recorder.games / elapsed if elapsed else 0.0,
+        "total": total,
+        "routes": routes,
+    }
+
+
+def summarize(ordered, errors, elapsed):
+    summary = {
+        "requests": len(ordered),
+        "errors": errors,
+        "error_rate": errors / len(ordered) if ordered else 0.0,
+        "throughput": len(ordered) / elapsed if elapsed else 0.0,
+    }
+    for q in PERCENTILES:
+        summary[f"p{q}"] = percentile(ordered, q)
+    return summary
+
+
+def serve_in_background(flask_app):
+    server = make_server("127.0.0.1", 0, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def print_report(result):
+    print(
+        f"{result['games']} games in {result['elapsed']:.2f} s "
+        f"({result['games_per_second']:.1f} games/s, "
+        f"concurrency {result['concurrency']})"
+    )
+    header = f"{'route':12} {'requests':>9} {'req/s':>9} {'errors':>7}"
+    print(header + "".join(f" {f'p{q} ms':>9}" for q in PERCENTILES))
+    rows = sorted(result["routes"].items()) + [("total", result["total"])]
+    for route, summary in rows:
+        line = (
+            f"{route:12} {summary['requests']:9d} {summary['throughput']:9.1f} "
+            f"{summary['error_rate']:7.2%}"
+        )
+        print(line + "".join(f" {summary[f'p{q}'] * 1000:9.2f}" for q in PERCENTILES))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="drive a running server instead")
+    target.add_argument(
+        "--serve", action="store_true", help="start a local server and drive it"
+    )
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--max-turns", type=int, default=300)
+    parser.add_argument(
+        "--think", type=float, default=0.0, help="mean seconds between draws"
+    )
+    parser.add_argument("--max-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        url = args.url
+    else:
+        logging.disable(logging.CRITICAL)
+        flask_app = candyland.create_app()
+        if args.serve:
+            server, url = serve_in_background(flask_app)
+    if args.url or args.serve:
+        make_transport = functools.partial(HttpTransport, url)
+    else:
+        make_transport = functools.partial(InProcessTransport, flask_app)
+
+    try:
+        result = run(
+            make_transport,
+            args.games,
+            args.concurrency,
+            args.players,
+            args.max_turns,
+            args.think,
+        )
+    finally:
+        if server is not None:
+            server.shutdown()
+    print_report(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    return 1 if result["total"]["error_rate"] > args.max_error_rate else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Per-game memory footprint with a shared board versus a board per game.
+
+Run from the repository root:
+
+    python -m benchmarks.memory --games 10000
+"""
+
+import argparse
+import gc
+import logging
+import tracemalloc
+
+from app import Board, Game
+
+
+def measure(num_games, own_board):
+    names = ["Alice", "Bob", "Carol", "Dave"]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = [
+        Game(len(names), names, board=Board() if own_board else None)
+        for _ in range(num_games)
+    ]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del games
+    return (after - before) / num_games
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=10_000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    per_game_board = measure(args.games, own_board=True)
+    shared_board = measure(args.games, own_board=False)
+    print(f"live games: {args.games}")
+    print(f"board per game: {per_game_board / 1024:8.1f} KiB per game")
+    print(f"shared board:   {shared_board / 1024:8.1f} KiB per game")
+    print(f"saved:          {per_game_board / shared_board:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Worker start-up time: a cold process versus a fork of a preloaded master.
+
+Run from the repository root:
+
+    python -m benchmarks.startup --runs 10
+
+"cold" imports wsgi (create_app included) in a fresh interpreter and serves
+one request, which is what every worker does without --preload. "forked"
+forks an already warmed process and times the child's first request.
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+COLD_SCRIPT = """
+import time
+started = time.perf_counter()
+import wsgi
+wsgi.app.test_client().get("/")
+print(time.perf_counter() - started)
+"""
+
+
+def cold_start(env):
+    output = subprocess.run(
+        [sys.executable, "-c", COLD_SCRIPT],
+        capture_output=True,
+        check=True,
+        env=env,
+        text=True,
+    )
+    return float(output.stdout.split()[-1])
+
+
+def forked_start(app):
+    read_end, write_end = os.pipe()
+    started = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        app.test_client().get("/")
+        os.write(write_end, str(time.perf_counter() - started).encode())
+        os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as pipe:
+        elapsed = float(pipe.read())
+    os.waitpid(pid, 0)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    env = {**os.environ, "CANDYLAND_LOG_LEVEL": "WARNING"}
+    os.environ.update(env)
+
+    cold = [cold_start(env) for _ in range(args.runs)]
+    import wsgi
+
+    logging.disable(logging.CRITICAL)
+    timings = wsgi.app.config["STARTUP_TIMINGS"]
+    forked = [forked_start(wsgi.app) for _ in range(args.runs)]
+
+    print("master start-up:", end="")
+    for step, seconds in timings.items():
+        print(f"  {step} {seconds * 1000:.1f} ms", end="")
+    print()
+    print(f"cold worker to first response:   {statistics.median(cold) * 1000:8.1f} ms")
+    print(
+        f"forked worker to first response: {statistics.median(forked) * 1000:8.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
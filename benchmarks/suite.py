@@ -0,0 +1,182 @@
+"""Timing benchmarks for the game engine and the Flask routes.
+
+Run from the repository root:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --compare baseline.json --threshold 0.25
+
+With --compare, exits with status 1 when a tracked benchmark is more than
+--threshold (a fraction) slower than in the baseline file.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import platform
+import random
+import sys
+import time
+import timeit
+
+import app as candyland
+from app import CARDS, Board, Deck, Game
+
+NAMES = ["Alice", "Bob", "Carol", "Dave"]
+
+# Hot paths that fail a comparison when they regress.
+TRACKED = ("deck_draw", "move_player", "play_turn_game", "get_game", "post_draw")
+
+
+def bench_board_construction():
+    return Board
+
+
+def bench_deck_draw():
+    # Runs straight through reshuffles, one every len(CARDS) draws.
+    return Deck(random.Random(0)).draw
+
+
+def bench_move_player():
+    game = Game(len(NAMES), NAMES, seed=0)
+    player = game.players[0]
+    cards = itertools.cycle(random.Random(1).sample(CARDS, len(CARDS)))
+
+    def move():
+        if player.position >= 133:
+            player.position = 0
+            game.status = "InProgress"
+        game.move_player(player, next(cards))
+
+    return move
+
+
+def bench_play_turn_game():
+    seeds = itertools.count()
+
+    def play():
+        game = Game(len(NAMES), NAMES, seed=next(seeds))
+        while game.status != "Finished":
+            game.play_turn()
+
+    return play
+
+
+def bench_autoplay_game():
+    seeds = itertools.count()
+    return lambda: Game(len(NAMES), NAMES, seed=next(seeds)).autoplay()
+
+
+def route_client():
+    candyland.app.config["TESTING"] = True
+    client = candyland.app.test_client()
+    client.post("/start", data={"num_players": "2", "player1": "A", "player2": "B"})
+    return client
+
+
+def bench_get_game():
+    client = route_client()
+    return lambda: client.get("/game")
+
+
+def bench_post_draw():
+    client = route_client()
+    headers = {"Accept": "application/json"}
+
+    def draw():
+        if client.post("/draw", headers=headers).status_code == 409:
+            client.post("/start", data={"num_players": "2"})
+
+    return draw
+
+
+BENCHMARKS = {
+    "board_construction": bench_board_construction,
+    "deck_draw": bench_deck_draw,
+    "move_player": bench_move_player,
+    "play_turn_game": bench_play_turn_game,
+    "autoplay_game": bench_autoplay_game,
+    "get_game": bench_get_game,
+    "post_draw": bench_post_draw,
+}
+
+
+def measure(func, repeat=5, min_time=0.2):
+    # Best and median seconds per call over `repeat` timed runs.
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    runs = sorted(t / number for t in timer.repeat(repeat=repeat, number=number))
+    return {"best": runs[0], "median": runs[len(runs) // 2], "number": number}
+
+
+def run(names=None, repeat=5, min_time=0.2):
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = measure(BENCHMARKS[name](), repeat, min_time)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold, tracked=TRACKED):
+    # Returns (name, ratio, regressed) for benchmarks present in both runs.
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        ratio = result["best"] / before["best"]
+        rows.append((name, ratio, name in tracked and ratio > 1 + threshold))
+    return rows
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default all)")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    args = parser.parse_args(argv)
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    logging.disable(logging.CRITICAL)
+
+    current = run(args.names, args.repeat, args.min_time)
+    for name, result in current["results"].items():
+        best, median = format_time(result["best"]), format_time(result["median"])
+        print(f"{name:20} {best}  (median {median})")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(baseline, current, args.threshold)
+        print()
+        for name, ratio, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{name:20} {ratio:6.2f}x baseline{flag}")
+        if any(regressed for _, _, regressed in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
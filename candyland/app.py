@@ -1,6 +1,10 @@
+import os
 import random
+from types import MappingProxyType
 
-from flask import Flask, redirect, render_template, request, url_for
+from flask import Flask, redirect, render_template, request, session, url_for
+
+from registry import GameRegistry
 
 app = Flask(__name__)
 app.secret_key = "candyland-secret-key"  # for flash messages
@@ -45,6 +49,8 @@ class Square:
 class Board:
     def __init__(self):
         self.spaces = self.generate_board()
+        self.color_jumps = self.build_color_jumps()
+        self.picture_index = self.build_picture_index()
 
     def generate_board(self):
         board = []
@@ -88,6 +94,32 @@ class Board:
 
         return board
 
+    def build_color_jumps(self, max_steps=2):
+        # color_jumps[color][n - 1][pos] is the index of the n-th square of
+        # `color` after `pos`, or None if there are fewer than n left.
+        jumps = {}
+        for color in COLORS:
+            nearest = [None] * len(self.spaces)
+            next_pos = None
+            for pos in range(len(self.spaces) - 1, -1, -1):
+                nearest[pos] = next_pos
+                if self.spaces[pos].color == color:
+                    next_pos = pos
+            steps = [tuple(nearest)]
+            for _ in range(1, max_steps):
+                steps.append(
+                    tuple(nearest[p] if p is not None else None for p in steps[-1])
+                )
+            jumps[color] = tuple(steps)
+        return MappingProxyType(jumps)
+
+    def build_picture_index(self):
+        index = {}
+        for square in self.spaces:
+            if square.is_picture and square.picture_name not in index:
+                index[square.picture_name] = square.index
+        return MappingProxyType(index)
+
 
 class Card:
     def __init__(self, card_type, value):
@@ -175,18 +207,11 @@ class Game:
 
         if card.card_type in ["single", "double"]:
             needed = 1 if card.card_type == "single" else 2
-            found = 0
-            for pos in range(orig_position + 1, len(board)):
-                if board[pos].color == card.value:
-                    found += 1
-                    if found == needed:
-                        new_position = pos
-                        break
+            jumps = self.board.color_jumps.get(card.value)
+            if jumps is not None and jumps[needed - 1][orig_position] is not None:
+                new_position = jumps[needed - 1][orig_position]
         elif card.card_type == "picture":
-            for pos in range(len(board)):
-                if board[pos].is_picture and board[pos].picture_name == card.value:
-                    new_position = pos
-                    break
+            new_position = self.board.picture_index.get(card.value, orig_position)
 
         move_msg = f"Player {player.name} moves from {orig_position} to {new_position} due to {card}."
         self.messages.append(move_msg)
@@ -227,8 +252,16 @@ class Game:
         return card
 
 
-# ---------- Global Game Instance ----------
-game = None
+# ---------- Game Registry ----------
+registry = GameRegistry(
+    max_games=int(os.environ.get("CANDYLAND_MAX_GAMES", 1000)),
+    ttl_seconds=float(os.environ.get("CANDYLAND_GAME_TTL", 3600)),
+)
+
+
+def current_game():
+    return registry.get(session.get("game_id"))
+
 
 # ---------- Flask Routes ----------
 
@@ -240,18 +273,21 @@ def setup():
 
 @app.route("/start", methods=["POST"])
 def start():
-    global game
     num_players = int(request.form.get("num_players"))
     names = []
     for i in range(1, num_players + 1):
         name = request.form.get(f"player{i}")
         names.append(name)
-    game = Game(num_players, names)
+    old_game_id = session.get("game_id")
+    if old_game_id is not None:
+        registry.discard(old_game_id)
+    session["game_id"] = registry.add(Game(num_players, names))
     return redirect(url_for("game_route"))
 
 
 @app.route("/game", methods=["GET"])
 def game_route():
+    game = current_game()
     if game is None:
         return redirect(url_for("setup"))
     return render_template("game.html", game=game)
@@ -259,7 +295,7 @@ def game_route():
 
 @app.route("/draw", methods=["POST"])
 def draw():
-    global game
+    game = current_game()
     if game is None or game.status == "Finished":
         return redirect(url_for("game_route"))
     game.play_turn()
@@ -268,8 +304,9 @@ def draw():
 
 @app.route("/reset", methods=["POST"])
 def reset():
-    global game
-    game = None
+    game_id = session.pop("game_id", None)
+    if game_id is not None:
+        registry.discard(game_id)
     return redirect(url_for("setup"))
 
 
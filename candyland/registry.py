@@ -0,0 +1,78 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class GameRegistry:
+    """Concurrent games keyed by game id, with LRU eviction and an idle TTL."""
+
+    def __init__(self, max_games=1000, ttl_seconds=3600, clock=time.monotonic):
+        if max_games < 1:
+            raise ValueError("max_games must be at least 1")
+        self.max_games = max_games
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._games = OrderedDict()  # game_id -> [game, last_access], oldest first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._games)
+
+    def __contains__(self, game_id):
+        return self.get(game_id) is not None
+
+    def add(self, game):
+        game_id = uuid.uuid4().hex
+        now = self._clock()
+        with self._lock:
+            self._purge_expired(now)
+            while len(self._games) >= self.max_games:
+                evicted_id, _ = self._games.popitem(last=False)
+                logger.info("Evicted least recently used game %s.", evicted_id)
+            self._games[game_id] = [game, now]
+        return game_id
+
+    def get(self, game_id):
+        if game_id is None:
+            return None
+        now = self._clock()
+        with self._lock:
+            entry = self._games.get(game_id)
+            if entry is None:
+                return None
+            if self._is_expired(entry, now):
+                del self._games[game_id]
+                logger.info("Game %s expired after idling.", game_id)
+                return None
+            entry[1] = now
+            self._games.move_to_end(game_id)
+            return entry[0]
+
+    def discard(self, game_id):
+        with self._lock:
+            return self._games.pop(game_id, None) is not None
+
+    def purge_expired(self):
+        with self._lock:
+            return self._purge_expired(self._clock())
+
+    def _is_expired(self, entry, now):
+        return self.ttl_seconds is not None and now - entry[1] > self.ttl_seconds
+
+    def _purge_expired(self, now):
+        # Entries are kept in access order, so expired ones are at the front.
+        purged = 0
+        while self._games:
+            game_id, entry = next(iter(self._games.items()))
+            if not self._is_expired(entry, now):
+                break
+            del self._games[game_id]
+            purged += 1
+        if purged:
+            logger.info("Purged %s expired games.", purged)
+        return purged
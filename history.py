@@ -0,0 +1,80 @@
+"""Compact, fixed-width turn history.
+
+Every turn is stored as one 7-byte TURN_RECORD (player index, card code,
+from square, to square, flags) in a single bytearray per game, instead of
+as formatted strings. Game.turn_messages renders text from these records
+only when a page or API asks for it.
+"""
+
+import struct
+from collections import namedtuple
+
+# Compact description of one turn; card is None when no card was drawn.
+TurnRecord = namedtuple(
+    "TurnRecord", ["player", "card", "from_square", "to_square", "flags"]
+)
+
+# TurnRecord.flags bits
+TURN_SHORTCUT = 1
+TURN_LOSES_NEXT = 2
+TURN_WON = 4
+TURN_RESHUFFLED = 8
+TURN_SKIPPED = 16  # the player lost this turn to an earlier lose-turn square
+
+NO_CARD = 0xFF
+# player, card, from, to, flags
+TURN_RECORD = struct.Struct("<BBHHB")
+
+
+def encode_turn(record):
+    card = NO_CARD if record.card is None else record.card
+    return TURN_RECORD.pack(
+        record.player, card, record.from_square, record.to_square, record.flags
+    )
+
+
+def decode_turn(player, card, from_square, to_square, flags):
+    return TurnRecord(
+        player, None if card == NO_CARD else card, from_square, to_square, flags
+    )
+
+
+class TurnHistory:
+    """Append-only sequence of TurnRecords packed into one bytearray."""
+
+    def __init__(self, data=b""):
+        if len(data) % TURN_RECORD.size:
+            raise ValueError("turn history is not a whole number of records")
+        self._data = bytearray(data)
+
+    def __len__(self):
+        return len(self._data) // TURN_RECORD.size
+
+    def __iter__(self):
+        for fields in TURN_RECORD.iter_unpack(self._data):
+            yield decode_turn(*fields)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("turn history slices must be contiguous")
+            size = TURN_RECORD.size
+            return TurnHistory(self._data[start * size : stop * size])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("turn history index out of range")
+        return decode_turn(
+            *TURN_RECORD.unpack_from(self._data, index * TURN_RECORD.size)
+        )
+
+    def append(self, record):
+        self._data += encode_turn(record)
+
+    def to_bytes(self):
+        return bytes(self._data)
+
+    @property
+    def nbytes(self):
+        return len(self._data)
@@ -0,0 +1,140 @@
+"""Logging configuration for the Candyland app, driven by environment variables.
+
+CANDYLAND_LOG_LEVEL        root level (default DEBUG)
+CANDYLAND_TURN_LOG_LEVEL   level of the per-turn logger (default INFO)
+CANDYLAND_TURN_LOG_SAMPLE  fraction of per-turn records to keep (default 1.0)
+CANDYLAND_LOG_FORMAT       "text" (default) or "json"
+CANDYLAND_LOG_QUEUE        "1" to hand records to a background listener thread
+"""
+
+import atexit
+import json
+import logging
+import logging.config
+import logging.handlers
+import os
+import queue
+import random
+
+# One structured record per turn is logged here; see Game.play_turn.
+TURN_LOGGER = "candyland.turns"
+
+TEXT_FORMAT = "[%(asctime)s] %(levelname)s in %(module)s: %(message)s"
+
+_listener = None
+
+
+class TurnSampler(logging.Filter):
+    """Keeps roughly `rate` of the records it sees."""
+
+    def __init__(self, rate, rand=random.random):
+        super().__init__()
+        self.rate = rate
+        self._rand = rand
+
+    def filter(self, record):
+        return self.rate >= 1 or self._rand() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "turn", None) or {})
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    # The stock QueueHandler formats each record before enqueueing it, on the
+    # caller's thread. Records stay in-process here, so leave formatting to
+    # the listener thread.
+    def prepare(self, record):
+        return record
+
+
+def logging_config(level="DEBUG", log_format="text"):
+    formatter = (
+        {"()": JsonFormatter} if log_format == "json" else {"format": TEXT_FORMAT}
+    )
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {"standard": formatter},
+        "handlers": {
+            "console": {
+                "class": "logging.StreamHandler",
+                "formatter": "standard",
+                "level": "DEBUG",
+            },
+        },
+        "root": {
+            "handlers": ["console"],
+            "level": level,
+        },
+    }
+
+
+def configure_logging(environ=None):
+    global _listener
+    environ = os.environ if environ is None else environ
+    level = environ.get("CANDYLAND_LOG_LEVEL", "DEBUG").upper()
+    log_format = environ.get("CANDYLAND_LOG_FORMAT", "text").lower()
+    turn_level = environ.get("CANDYLAND_TURN_LOG_LEVEL", "INFO").upper()
+    sample_rate = float(environ.get("CANDYLAND_TURN_LOG_SAMPLE", 1.0))
+    use_queue = environ.get("CANDYLAND_LOG_QUEUE", "0").lower() in ("1", "true", "yes")
+
+    stop_listener()
+    logging.config.dictConfig(logging_config(level, log_format))
+
+    turn_logger = logging.getLogger(TURN_LOGGER)
+    turn_logger.setLevel(turn_level)
+    for existing in [f for f in turn_logger.filters if isinstance(f, TurnSampler)]:
+        turn_logger.removeFilter(existing)
+    if sample_rate < 1:
+        turn_logger.addFilter(TurnSampler(sample_rate))
+
+    if use_queue:
+        root = logging.getLogger()
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(
+            records, *root.handlers, respect_handler_level=True
+        )
+        root.handlers = [DeferredQueueHandler(records)]
+        _listener.start()
+
+    logging.getLogger(__name__).debug(
+        "Logging configured: level=%s format=%s turn_level=%s sample=%s queue=%s",
+        level,
+        log_format,
+        turn_level,
+        sample_rate,
+        use_queue,
+    )
+
+
+def stop_listener():
+    # Flushes queued records; safe to call when no listener is running.
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_listener():
+    # The listener thread does not survive fork; a forked worker needs its own.
+    global _listener
+    if _listener is not None:
+        _listener = logging.handlers.QueueListener(
+            _listener.queue, *_listener.handlers, respect_handler_level=True
+        )
+        _listener.start()
+
+
+atexit.register(stop_listener)
+os.register_at_fork(after_in_child=_restart_listener)
@@ -0,0 +1,123 @@
+"""Exact game-length and win-probability distributions for Candyland.
+
+Candyland has no decisions, so each pawn is a Markov chain over
+(square, loses-next-turn) states. Cards are drawn with replacement, which
+makes the pawns independent; the seat results then follow in closed form
+from one pawn's finishing-round distribution.
+
+Lengths are counted in rounds: one round gives every seat one turn, and a
+lost turn uses up that player's round. The expected length is also given
+in turns, i.e. cards drawn, which is what Game.turn_count and
+simulation.py count. It follows from each seat's chance of drawing in each
+round. A PMF in turns would need every seat's joint distribution of rounds
+and cards drawn, so the PMF stays in rounds. A real deck is drawn without
+replacement, which makes games a few rounds shorter; use simulation.py
+when that difference matters (simulate_games(..., replacement=True)
+reproduces this model).
+"""
+
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+from simulation import build_move_tables
+
+GameLength = namedtuple(
+    "GameLength", ["pmf", "expected_rounds", "expected_turns", "seat_wins"]
+)
+
+
+def transition_matrix(tables=None):
+    # State pos is "on square pos"; state pos + n is "on square pos and
+    # about to lose a turn". The finish square is absorbing.
+    tables = tables if tables is not None else build_move_tables()
+    destination, loses_turn, finish = tables
+    num_cards, num_squares = destination.shape
+    matrix = np.zeros((2 * num_squares, 2 * num_squares))
+    card_probability = 1.0 / num_cards
+
+    for pos in range(num_squares):
+        if pos >= finish:
+            matrix[pos, pos] = 1.0
+            continue
+        targets = destination[:, pos] + num_squares * loses_turn[:, pos]
+        np.add.at(matrix[pos], targets, card_probability)
+        matrix[pos + num_squares, pos] = 1.0
+
+    return matrix, finish
+
+
+def finish_round_pmf(tables=None, tol=1e-12, max_rounds=10_000):
+    # pmf[t] is the probability that a lone pawn reaches the finish square
+    # on its t-th round (pmf[0] is always 0).
+    return _pawn_rounds(tables, tol, max_rounds)[0]
+
+
+def _pawn_rounds(tables, tol, max_rounds):
+    # (finish pmf, draws): draws[t] is the probability that a lone pawn
+    # draws a card in round t, i.e. is neither finished nor losing the turn.
+    matrix, finish = transition_matrix(tables)
+    state = np.zeros(matrix.shape[0])
+    state[0] = 1.0
+    finished = [0.0]
+    draws = [0.0]
+    for _ in range(max_rounds):
+        draws.append(state[:finish].sum())
+        state = state @ matrix
+        finished.append(state[finish])
+        if 1.0 - state[finish] < tol:
+            break
+    return np.diff(np.array(finished), prepend=0.0), np.array(draws)
+
+
+def game_length(num_players, tables=None, tol=1e-12):
+    if not 1 <= num_players <= 6:
+        raise ValueError("num_players must be between 1 and 6")
+    pawn_pmf, draws = _pawn_rounds(tables, tol, max_rounds=10_000)
+    survival = 1.0 - np.cumsum(pawn_pmf)  # P(pawn not finished after round t)
+    survival_before = np.concatenate(([1.0], survival[:-1]))
+
+    # The game ends in the first round in which any pawn finishes.
+    pmf = survival_before**num_players - survival**num_players
+    expected_rounds = float(np.sum(survival**num_players))
+    # Seat k draws in round t if it can, the seats before it have not
+    # finished by the end of round t and the seats after it not before t.
+    expected_turns = float(
+        sum(
+            np.sum(draws * survival**seat * survival_before ** (num_players - 1 - seat))
+            for seat in range(num_players)
+        )
+    )
+
+    # Seat k wins round t if it finishes then, the seats before it have not
+    # finished by the end of round t and the seats after it not before t.
+    seat_wins = np.array(
+        [
+            np.sum(
+                pawn_pmf * survival**seat * survival_before ** (num_players - 1 - seat)
+            )
+            for seat in range(num_players)
+        ]
+    )
+    return GameLength(pmf, expected_rounds, expected_turns, seat_wins)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=4)
+    args = parser.parse_args()
+
+    result = game_length(args.players)
+    cumulative = np.cumsum(result.pmf)
+    print(f"players: {args.players}")
+    print(f"expected rounds: {result.expected_rounds:.3f}")
+    print(f"expected turns: {result.expected_turns:.3f}")
+    print(f"median rounds: {int(np.searchsorted(cumulative, 0.5))}")
+    print(f"p95 rounds: {int(np.searchsorted(cumulative, 0.95))}")
+    for seat, share in enumerate(result.seat_wins):
+        print(f"seat {seat + 1}: wins {share:.2%}")
+
+
+if __name__ == "__main__":
+    main()
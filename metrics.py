@@ -0,0 +1,150 @@
+"""Minimal in-process metrics rendered in the Prometheus text format.
+
+Updating a metric is a lock and a few additions; all formatting happens in
+MetricsRegistry.render, so the cost lands on whoever scrapes /metrics.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+TURN_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.01)
+
+
+def format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    inner = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", r"\\").replace('"', r"\""))
+        for name, value in pairs
+    )
+    return "{" + inner + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values -> count
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labelnames:
+            values = [((), 0)]
+        for labels, value in values:
+            yield self.name, format_labels(self.labelnames, labels), value
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help_text, func):
+        # The value is read from func() at scrape time.
+        self.name = name
+        self.help = help_text
+        self._func = func
+
+    def samples(self):
+        yield self.name, "", self._func()
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            series = sorted(
+                (labels, (list(counts), total))
+                for labels, (counts, total) in self._series.items()
+            )
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = (("le", format_value(bound)),)
+                yield (
+                    f"{self.name}_bucket",
+                    format_labels(self.labelnames, labels, le),
+                    cumulative,
+                )
+            label_text = format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum", label_text, total
+            yield f"{self.name}_count", label_text, cumulative
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {format_value(value)}")
+        return "\n".join(lines) + "\n"
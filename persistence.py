@@ -0,0 +1,260 @@
+"""Event-sourced game persistence in a local SQLite database.
+
+Each game is stored as a binary snapshot of its state and turn history plus
+an append-only log of the turns played since that snapshot. Restoring a game
+loads the snapshot and its history and replays the tail; a new snapshot
+replaces the log every SNAPSHOT_EVERY turns. The deck is not stored: its
+order and RNG state are rebuilt from the game's seed and how many times it
+has been shuffled. The board is stored as its layout id and must be
+compiled again on restore.
+"""
+
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+import weakref
+
+from history import TurnHistory, encode_turn
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 3
+SNAPSHOT_EVERY = 32
+
+STATUS_CODES = {"Setup": 0, "InProgress": 1, "Finished": 2}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+NO_VALUE = 0xFF  # no winner / no card yet
+
+# version, players, current player, status, winner, last card, deck cursor,
+# deck shuffles, turn count, seed, board layout id
+SNAPSHOT_HEADER = struct.Struct("<BBBBBBBHIQ8s")
+PLAYER_STATE = struct.Struct("<HB")  # position, skip flag
+
+
+def encode_snapshot(game):
+    winner = game.players.index(game.winner) if game.winner else NO_VALUE
+    last_card = NO_VALUE if game.last_card_code is None else game.last_card_code
+    parts = [
+        SNAPSHOT_HEADER.pack(
+            SNAPSHOT_VERSION,
+            len(game.players),
+            game.current_player_index,
+            STATUS_CODES[game.status],
+            winner,
+            last_card,
+            game.deck.cursor,
+            game.deck.shuffles,
+            game.turn_count,
+            game.seed,
+            bytes.fromhex(game.board.layout_id),
+        )
+    ]
+    for player in game.players:
+        parts.append(PLAYER_STATE.pack(player.position, player.skip_turn))
+    for player in game.players:
+        name = player.name.encode("utf-8")
+        parts.append(struct.pack("<B", len(name)) + name)
+    return b"".join(parts)
+
+
+def decode_snapshot(blob, game_factory, boards=None):
+    (
+        version,
+        num_players,
+        current,
+        status,
+        winner,
+        last_card,
+        cursor,
+        shuffles,
+        turn_count,
+        seed,
+        layout_id,
+    ) = SNAPSHOT_HEADER.unpack_from(blob)
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}")
+    offset = SNAPSHOT_HEADER.size
+    player_states = []
+    for _ in range(num_players):
+        player_states.append(PLAYER_STATE.unpack_from(blob, offset))
+        offset += PLAYER_STATE.size
+    names = []
+    for _ in range(num_players):
+        length = blob[offset]
+        names.append(blob[offset + 1 : offset + 1 + length].decode("utf-8"))
+        offset += 1 + length
+
+    board = (boards or {}).get(layout_id.hex())
+    if board is None:
+        raise ValueError(f"Unknown board layout {layout_id.hex()}")
+    game = game_factory(num_players, names, board, seed=seed)
+    while game.deck.shuffles < shuffles:
+        game.deck.shuffle()
+    for player, (position, skip_turn) in zip(game.players, player_states):
+        player.position = position
+        player.skip_turn = bool(skip_turn)
+    game.current_player_index = current
+    game.status = STATUS_NAMES[status]
+    game.winner = game.players[winner] if winner != NO_VALUE else None
+    game.last_card_code = last_card if last_card != NO_VALUE else None
+    game.deck.cursor = cursor
+    game.turn_count = turn_count
+    return game
+
+
+class GameStore:
+    def __init__(self, path, game_factory, boards, snapshot_every=SNAPSHOT_EVERY):
+        # boards maps layout ids to the compiled boards games may use.
+        self.path = path
+        self.game_factory = game_factory
+        self.boards = boards
+        self.snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        self._db = self._connect()
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                game_id TEXT PRIMARY KEY,
+                turn INTEGER NOT NULL,
+                state BLOB NOT NULL,
+                updated_at REAL NOT NULL,
+                history BLOB NOT NULL DEFAULT x''
+            );
+            CREATE TABLE IF NOT EXISTS turns (
+                game_id TEXT NOT NULL,
+                turn INTEGER NOT NULL,
+                record BLOB NOT NULL,
+                PRIMARY KEY (game_id, turn)
+            ) WITHOUT ROWID;
+            """)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(snapshots)")}
+        if "history" not in columns:  # databases from before histories were kept
+            with self._db:
+                self._db.execute(
+                    "ALTER TABLE snapshots ADD COLUMN history BLOB NOT NULL DEFAULT x''"
+                )
+        self._snapshot_turns = {}  # game_id -> turn of its latest snapshot
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: ref() and ref()._after_fork())
+        logger.info("Opened game store at %s.", path)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _after_fork(self):
+        # A SQLite connection must not be shared across fork; leave the
+        # parent's alone and give the forked worker its own.
+        self._lock = threading.Lock()
+        self._db = self._connect()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def save_snapshot(self, game_id, game):
+        state = encode_snapshot(game)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                (
+                    game_id,
+                    game.turn_count,
+                    state,
+                    time.time(),
+                    game.history.to_bytes(),
+                ),
+            )
+            self._db.execute("DELETE FROM turns WHERE game_id = ?", (game_id,))
+            self._snapshot_turns[game_id] = game.turn_count
+
+    def record_turn(self, game_id, game):
+        # Call after each play_turn; snapshots instead when one is due.
+        since_snapshot = game.turn_count - self._snapshot_turns.get(game_id, 0)
+        if since_snapshot >= self.snapshot_every or game.status == "Finished":
+            self.save_snapshot(game_id, game)
+            return
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO turns VALUES (?, ?, ?)",
+                (game_id, game.turn_count, encode_turn(game.last_turn)),
+            )
+            self._db.execute(
+                "UPDATE snapshots SET updated_at = ? WHERE game_id = ?",
+                (time.time(), game_id),
+            )
+
+    def delete(self, game_id):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM snapshots WHERE game_id = ?", (game_id,))
+            self._db.execute("DELETE FROM turns WHERE game_id = ?", (game_id,))
+            self._snapshot_turns.pop(game_id, None)
+
+    def purge(self, max_age):
+        cutoff = time.time() - max_age
+        with self._lock, self._db:
+            stale = [
+                row[0]
+                for row in self._db.execute(
+                    "SELECT game_id FROM snapshots WHERE updated_at < ?", (cutoff,)
+                )
+            ]
+            for game_id in stale:
+                self._db.execute("DELETE FROM snapshots WHERE game_id = ?", (game_id,))
+                self._db.execute("DELETE FROM turns WHERE game_id = ?", (game_id,))
+                self._snapshot_turns.pop(game_id, None)
+        if stale:
+            logger.info("Purged %s stale games from the store.", len(stale))
+        return len(stale)
+
+    def load_all(self, limit=-1):
+        # Returns (game_id, game) pairs, least recently updated first, so
+        # adding them to the registry in order keeps its LRU order.
+        started = time.perf_counter()
+        with self._lock:
+            snapshots = self._db.execute(
+                "SELECT game_id, turn, state, history FROM snapshots"
+                " ORDER BY updated_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+            tails = {}
+            for game_id, record in self._db.execute(
+                "SELECT game_id, record FROM turns ORDER BY game_id, turn"
+            ):
+                tails.setdefault(game_id, []).append(record)
+
+        games = []
+        for game_id, turn, state, history in reversed(snapshots):
+            try:
+                game = decode_snapshot(state, self.game_factory, self.boards)
+                game.history = TurnHistory(history)
+            except ValueError as e:
+                logger.warning("Skipping stored game %s: %s", game_id, e)
+                continue
+            self._snapshot_turns[game_id] = turn
+            self._replay(game_id, game, tails.get(game_id, ()))
+            game.events.append("restore", "Game restored.")
+            games.append((game_id, game))
+        logger.info(
+            "Restored %s games in %.1f ms.",
+            len(games),
+            (time.perf_counter() - started) * 1000,
+        )
+        return games
+
+    def _replay(self, game_id, game, records):
+        # The snapshot restores the deck's RNG state, so replaying the tail
+        # redraws exactly the recorded cards, even across reshuffles.
+        for blob in records:
+            if game.status == "Finished":
+                break
+            game.play_turn(quiet=True)
+            if encode_turn(game.last_turn) != blob:
+                logger.error(
+                    "Replay of game %s diverged at turn %s.", game_id, game.turn_count
+                )
+                break
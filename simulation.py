@@ -0,0 +1,159 @@
+"""Vectorized batch simulation of complete Candyland games.
+
+Advances many games in lockstep with NumPy, one turn per step, following
+the same rules as ``Game.play_turn``. A "turn" is one card drawn, so turn
+counts match the number of ``play_turn`` calls on the object model.
+"""
+
+import argparse
+import logging
+from collections import namedtuple
+
+import numpy as np
+
+from app import DEFAULT_BOARD
+
+logger = logging.getLogger(__name__)
+
+SimulationResult = namedtuple("SimulationResult", ["turns", "winners"])
+MoveTables = namedtuple("MoveTables", ["destination", "loses_turn", "finish"])
+
+
+def build_move_tables(board=None, cards=None):
+    # destination[code, pos] is where a pawn on `pos` ends up after drawing
+    # card `code`, shortcut included; loses_turn[code, pos] is set when that
+    # landing square makes the player miss their next turn.
+    board = board if board is not None else DEFAULT_BOARD
+    cards = cards if cards is not None else board.cards
+    spaces = board.spaces
+    finish = spaces[-1].index
+    destination = np.empty((len(cards), len(spaces)), dtype=np.int16)
+    loses_turn = np.zeros((len(cards), len(spaces)), dtype=bool)
+
+    for code, card in enumerate(cards):
+        for pos in range(len(spaces)):
+            if card.card_type in ("single", "double"):
+                jumps = board.color_jumps.get(card.value)
+                needed = 1 if card.card_type == "single" else 2
+                new_position = jumps[needed - 1][pos] if jumps else finish
+            else:
+                new_position = board.picture_index.get(card.value, pos)
+
+            square = spaces[new_position]
+            if square.is_shortcut_start and not square.is_finish:
+                new_position = square.shortcut_target
+                square = spaces[new_position]
+            destination[code, pos] = new_position
+            loses_turn[code, pos] = square.is_lose_turn and not square.is_finish
+
+    return MoveTables(destination, loses_turn, finish)
+
+
+def simulate_games(
+    num_games,
+    num_players,
+    seed=None,
+    batch_size=100_000,
+    tables=None,
+    replacement=False,
+):
+    # replacement=True draws every card from the full deck, as markov.py
+    # assumes, instead of dealing a shuffled deck as Deck does.
+    if not 1 <= num_players <= 6:
+        raise ValueError("num_players must be between 1 and 6")
+    rng = np.random.default_rng(seed)
+    tables = tables if tables is not None else build_move_tables()
+    turns = np.empty(num_games, dtype=np.int32)
+    winners = np.empty(num_games, dtype=np.int8)
+
+    for start in range(0, num_games, batch_size):
+        stop = min(start + batch_size, num_games)
+        turns[start:stop], winners[start:stop] = _simulate_batch(
+            stop - start, num_players, rng, tables, replacement
+        )
+
+    logger.info(
+        "Simulated %s games with %s players; mean %.2f turns.",
+        num_games,
+        num_players,
+        turns.mean() if num_games else 0.0,
+    )
+    return SimulationResult(turns, winners)
+
+
+def _simulate_batch(n, num_players, rng, tables, replacement=False):
+    destination, loses_turn, finish = tables
+    deck_size = destination.shape[0]
+
+    decks = rng.permuted(np.tile(np.arange(deck_size, dtype=np.uint8), (n, 1)), axis=1)
+    cursor = np.zeros(n, dtype=np.int32)
+    positions = np.zeros((n, num_players), dtype=np.int16)
+    skip = np.zeros((n, num_players), dtype=bool)
+    current = np.zeros(n, dtype=np.int64)
+    turns = np.zeros(n, dtype=np.int32)
+    winners = np.full(n, -1, dtype=np.int8)
+
+    active = np.arange(n)
+    while active.size:
+        if replacement:
+            cards = rng.integers(deck_size, size=active.size)
+        else:
+            # Reshuffle the decks that ran out, as Deck.draw does.
+            empty = cursor[active] == deck_size
+            if empty.any():
+                reshuffled = active[empty]
+                decks[reshuffled] = rng.permuted(decks[reshuffled], axis=1)
+                cursor[reshuffled] = 0
+
+            cards = decks[active, cursor[active]]
+            cursor[active] += 1
+        turns[active] += 1
+
+        player = current[active]
+        origin = positions[active, player]
+        landed = destination[cards, origin]
+        positions[active, player] = landed
+        lost = loses_turn[cards, origin]
+        skip[active[lost], player[lost]] = True
+
+        won = landed >= finish
+        winners[active[won]] = player[won]
+        active = active[~won]
+        current[active] = _advance_turn(active, current[active], skip, num_players)
+
+    return turns, winners
+
+
+def _advance_turn(games, current, skip, num_players):
+    # Mirrors Game.advance_turn: skipping players are passed over (and their
+    # flag cleared) until someone who may play is found.
+    next_player = (current + 1) % num_players
+    while True:
+        skipping = skip[games, next_player]
+        if not skipping.any():
+            return next_player
+        skip[games[skipping], next_player[skipping]] = False
+        next_player[skipping] = (next_player[skipping] + 1) % num_players
+        wrapped = skipping & (next_player == current) & skip[games, next_player]
+        skip[games[wrapped], next_player[wrapped]] = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=1_000_000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    result = simulate_games(args.games, args.players, seed=args.seed)
+    turns = result.turns
+    print(f"games: {args.games}, players: {args.players}")
+    print(f"turns: mean {turns.mean():.2f}, median {np.median(turns):.0f}, ", end="")
+    print(f"p95 {np.percentile(turns, 95):.0f}, max {turns.max()}")
+    wins = np.bincount(result.winners, minlength=args.players) / args.games
+    for seat, share in enumerate(wins):
+        print(f"seat {seat + 1}: wins {share:.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""Where games live between requests.
+
+MemoryStateStore, the default, keeps games in this process's GameRegistry,
+which is right for a single worker. SQLiteStateStore keeps every game's
+compact serialized state (its snapshot plus its turn history) in a SQLite
+database in WAL mode, so several worker processes on one machine can serve
+any game: it is a local stand-in for a shared cache.
+
+Changes go through update(game_id, mutate). The SQLite store loads the
+game, applies mutate and saves it only if the game's version is still the
+one it loaded, retrying from a fresh load when another worker got there
+first; a mutate that leaves the game's version alone writes nothing.
+Games loaded from SQLite rebuild their event feed from the turn history,
+so every worker numbers events the same way. Adding a game purges the
+table now and then, applying the registry's idle TTL and game limit.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+
+from history import TurnHistory
+from persistence import decode_snapshot, encode_snapshot
+from registry import GameRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class VersionConflict(Exception):
+    """A game kept changing underneath update() until it ran out of retries."""
+
+
+class MemoryStateStore:
+    """Games held in one process's registry; updates hold the game's lock."""
+
+    shared = False
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def __len__(self):
+        return len(self.registry)
+
+    def add(self, game, game_id=None):
+        return self.registry.add(game, game_id)
+
+    def get(self, game_id):
+        return self.registry.get(game_id)
+
+    def update(self, game_id, mutate):
+        # Returns mutate(game); raises KeyError for an unknown game.
+        game = self.registry.get(game_id)
+        if game is None:
+            raise KeyError(game_id)
+        with game.lock:
+            return mutate(game)
+
+    def discard(self, game_id):
+        return self.registry.discard(game_id)
+
+    def notify(self, game_id):
+        self.registry.notify(game_id)
+
+    def wait(self, game_id, predicate, timeout=None):
+        # Blocks until predicate(game) is true, the game goes away or the
+        # timeout passes, and returns predicate's final value.
+        game = self.registry.get(game_id)
+        if game is None:
+            return False
+        return self.registry.wait(game_id, lambda: predicate(game), timeout)
+
+
+class SQLiteStateStore:
+    """Games shared by every process that opens the same database file."""
+
+    shared = True
+
+    def __init__(
+        self,
+        path,
+        game_factory,
+        boards,
+        retries=20,
+        poll_interval=0.25,
+        cache_size=1000,
+        max_games=None,
+        ttl_seconds=None,
+        purge_interval=60,
+    ):
+        # boards maps layout ids to the compiled boards games may use.
+        # max_games and ttl_seconds (None: no limit) are enforced by purge,
+        # which add runs at most once every purge_interval seconds.
+        self.path = path
+        self.game_factory = game_factory
+        self.boards = boards
+        self.retries = retries
+        self.poll_interval = poll_interval
+        self.max_games = max_games
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        self.conflicts = 0  # lost compare-and-swaps, for monitoring
+        # game_id -> (version, game) for games decoded by this process;
+        # writers never touch these objects, they always decode afresh.
+        self._cache = GameRegistry(max_games=cache_size, ttl_seconds=None)
+        self._lock = threading.Lock()
+        self._db = self._connect()
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS game_state (
+                game_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                state BLOB NOT NULL,
+                history BLOB NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            """)
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: ref() and ref()._after_fork())
+        logger.info("Opened shared game state at %s.", path)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._db = self._connect()
+        self._cache = GameRegistry(max_games=self._cache.max_games, ttl_seconds=None)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM game_state").fetchone()[0]
+
+    def add(self, game, game_id=None):
+        game_id = game_id or uuid.uuid4().hex
+        self._cache.discard(game_id)
+        if time.monotonic() >= self._next_purge:
+            keep = None if self.max_games is None else self.max_games - 1
+            self.purge(self.ttl_seconds, keep)  # leaving room for this game
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO game_state VALUES (?, 1, ?, ?, ?)",
+                (game_id, encode_snapshot(game), game.history.to_bytes(), time.time()),
+            )
+        return game_id
+
+    def get(self, game_id):
+        # The current game, decoded again only when its version changed.
+        if game_id is None:
+            return None
+        row = self._fetch(game_id)
+        if row is None:
+            self._cache.discard(game_id)
+            return None
+        cached = self._cache.get(game_id)
+        if cached is not None and cached[0] == row[0]:
+            return cached[1]
+        game = self._decode(game_id, row)
+        if game is not None:
+            self._cache.add((row[0], game), game_id)
+        return game
+
+    def update(self, game_id, mutate):
+        # Returns mutate(game); raises KeyError for an unknown game and
+        # VersionConflict when every retry lost the race. mutate may run
+        # more than once, each time on a freshly loaded game.
+        for _ in range(self.retries):
+            row = self._fetch(game_id)
+            game = self._decode(game_id, row) if row is not None else None
+            if game is None:
+                raise KeyError(game_id)
+            result = mutate(game)
+            if game.version == row[0]:
+                return result  # nothing changed, so nothing to save
+            with self._lock, self._db:
+                saved = self._db.execute(
+                    "UPDATE game_state SET version = version + 1, state = ?,"
+                    " history = ?, updated_at = ? WHERE game_id = ? AND version = ?",
+                    (
+                        encode_snapshot(game),
+                        game.history.to_bytes(),
+                        time.time(),
+                        game_id,
+                        row[0],
+                    ),
+                ).rowcount
+            if saved:
+                return result
+            self.conflicts += 1
+            logger.debug("Game %s changed during an update; retrying.", game_id)
+        raise VersionConflict(f"Game {game_id} is changing too fast to update.")
+
+    def discard(self, game_id):
+        self._cache.discard(game_id)
+        with self._lock, self._db:
+            deleted = self._db.execute(
+                "DELETE FROM game_state WHERE game_id = ?", (game_id,)
+            ).rowcount
+        return bool(deleted)
+
+    def notify(self, game_id):
+        # Other processes cannot be woken; wait() polls instead.
+        pass
+
+    def wait(self, game_id, predicate, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            game = self.get(game_id)
+            if game is None:
+                return False
+            if predicate(game):
+                return True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            time.sleep(
+                self.poll_interval
+                if remaining is None
+                else min(self.poll_interval, remaining)
+            )
+
+    def purge(self, max_age=None, max_games=None):
+        # Deletes games idle for more than max_age seconds, then all but the
+        # max_games most recently updated ones; returns how many went.
+        self._next_purge = time.monotonic() + self.purge_interval
+        purged = 0
+        with self._lock, self._db:
+            if max_age is not None:
+                purged += self._db.execute(
+                    "DELETE FROM game_state WHERE updated_at < ?",
+                    (time.time() - max_age,),
+                ).rowcount
+            if max_games is not None:
+                purged += self._db.execute(
+                    "DELETE FROM game_state WHERE game_id NOT IN (SELECT game_id"
+                    " FROM game_state ORDER BY updated_at DESC LIMIT ?)",
+                    (max_games,),
+                ).rowcount
+        if purged:
+            logger.info("Purged %s stale games from the shared state.", purged)
+        return purged
+
+    def _fetch(self, game_id):
+        with self._lock:
+            return self._db.execute(
+                "SELECT version, state, history FROM game_state WHERE game_id = ?",
+                (game_id,),
+            ).fetchone()
+
+    def _decode(self, game_id, row):
+        version, state, history = row
+        try:
+            game = decode_snapshot(state, self.game_factory, self.boards)
+        except ValueError as e:
+            logger.warning("Cannot load game %s: %s", game_id, e)
+            return None
+        game.history = TurnHistory(history)
+        game.version = version  # the stored version only ever goes up
+        game.events.append("start", "Game started!")
+        for index, record in enumerate(game.history):
+            for position in range(len(game.turn_kinds(record))):
+                game.events.append_turn(index, position)
+        return game
@@ -0,0 +1,49 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from assets import AssetManifest
+
+
+class TestAssetManifest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.write("images/castle.png", b"\x89PNG castle")
+        self.write(
+            "css/style.css", b'body { background: url("../images/castle.png"); }'
+        )
+
+    def write(self, name, content):
+        path = os.path.join(self.root, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+
+    def test_names_change_with_content(self):
+        first = AssetManifest(self.root).url_name("images/castle.png")
+        self.assertRegex(first, r"^images/castle\.[0-9a-f]{12}\.png$")
+        self.assertEqual(AssetManifest(self.root).url_name("images/castle.png"), first)
+        self.write("images/castle.png", b"\x89PNG new castle")
+        self.assertNotEqual(
+            AssetManifest(self.root).url_name("images/castle.png"), first
+        )
+        self.assertIsNone(AssetManifest(self.root).url_name("images/missing.png"))
+
+    def test_css_references_versioned_names_and_is_gzipped(self):
+        manifest = AssetManifest(self.root)
+        image = manifest.url_name("images/castle.png")
+        css = manifest.get(manifest.url_name("css/style.css"))
+        self.assertIn(f'url("../{image}")'.encode(), css.body)
+        self.assertEqual(css.mimetype, "text/css")
+        self.assertIsNone(manifest.get(image).body)  # served from disk
+        self.write("css/style.css", b"body {}" * 100)
+        manifest = AssetManifest(self.root)
+        css = manifest.get(manifest.url_name("css/style.css"))
+        self.assertEqual(gzip.decompress(css.gzipped), css.body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import functools
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+import app as candyland
+from benchmarks import load, suite
+
+
+def results(**best):
+    return {"results": {name: {"best": value} for name, value in best.items()}}
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_compare_flags_tracked_regressions_only(self):
+        baseline = results(deck_draw=1.0, board_construction=1.0, post_draw=1.0)
+        current = results(deck_draw=1.5, board_construction=3.0, autoplay_game=1.0)
+        rows = suite.compare(baseline, current, threshold=0.25)
+        self.assertEqual(
+            rows, [("deck_draw", 1.5, True), ("board_construction", 3.0, False)]
+        )
+        rows = suite.compare(baseline, current, threshold=0.6)
+        self.assertFalse(any(regressed for _, _, regressed in rows))
+
+    def test_main_writes_results_and_fails_on_regression(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "results.json")
+            baseline = os.path.join(tmp, "baseline.json")
+            with open(baseline, "w") as f:
+                json.dump(results(deck_draw=1e-12), f)
+
+            argv = ["deck_draw", "--repeat", "1", "--min-time", "0.01"]
+            status = suite.main(argv + ["--output", output, "--compare", baseline])
+            self.assertEqual(status, 1)
+            with open(output) as f:
+                written = json.load(f)
+        self.assertGreater(written["results"]["deck_draw"]["best"], 0)
+        self.assertIn("python", written["meta"])
+
+
+class TestLoadHarness(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_percentile_uses_nearest_rank(self):
+        ordered = list(range(1, 101))
+        self.assertEqual(
+            [load.percentile(ordered, q) for q in (50, 95, 99)], [50, 95, 99]
+        )
+        self.assertEqual(load.percentile([7], 99), 7)
+        self.assertEqual(load.percentile([], 50), 0.0)
+
+    def test_in_process_run_drives_the_whole_flow(self):
+        transport = functools.partial(load.InProcessTransport, candyland.app)
+        result = load.run(transport, games=3, concurrency=2, max_turns=5)
+        self.assertEqual(result["games"], 3)
+        routes = result["routes"]
+        self.assertEqual(
+            sorted(routes), ["draw", "game_route", "reset", "setup", "start"]
+        )
+        self.assertEqual(routes["start"]["requests"], 3)
+        self.assertLessEqual(routes["draw"]["requests"], 15)
+        self.assertEqual(result["total"]["errors"], 0)
+        total = result["total"]
+        self.assertLessEqual(total["p50"], total["p95"])
+        self.assertLessEqual(total["p95"], total["p99"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import logging
+import threading
+import unittest
+from collections import Counter
+
+import app as candyland
+from app import Game
+
+THREADS = 8
+DRAWS_PER_THREAD = 25
+
+
+class TestConcurrentDraws(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        candyland.app.config["TESTING"] = True
+        owner = candyland.app.test_client()
+        owner.post("/start", data={"num_players": "4", "player1": "A", "player2": "B"})
+        with owner.session_transaction() as session:
+            self.game_id = session["game_id"]
+        self.game = candyland.registry.get(self.game_id)
+
+    def client(self):
+        # Every thread gets its own client bound to the same game.
+        client = candyland.app.test_client()
+        with client.session_transaction() as session:
+            session["game_id"] = self.game_id
+        return client
+
+    def hammer(self, worker, threads=THREADS):
+        results = Counter()
+        errors = []
+        start = threading.Barrier(threads)
+
+        def run():
+            client = self.client()
+            start.wait()
+            try:
+                worker(client, results)
+            except Exception as e:  # surfaced by the assertion below
+                errors.append(e)
+
+        pool = [threading.Thread(target=run) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def test_one_game_from_many_threads(self):
+        def draw(client, results):
+            headers = {"Accept": "application/json"}
+            for _ in range(DRAWS_PER_THREAD):
+                response = client.post("/draw", headers=headers)
+                results[response.status_code] += 1
+                client.get("/game/state")
+                client.get("/game/events?limit=5")
+
+        results = self.hammer(draw)
+        game = self.game
+        self.assertEqual(set(results), {200, 409})
+        self.assertEqual(game.status, "Finished")
+        # Every accepted draw played exactly one turn, and none after the win.
+        self.assertEqual(results[200], game.turn_count)
+
+        # The game matches a single-threaded replay of the same turns.
+        names = [p.name for p in game.players]
+        replay = Game.replay(names, game.seed, game.turn_count)
+        self.assertEqual(
+            [(p.position, p.skip_turn) for p in game.players],
+            [(p.position, p.skip_turn) for p in replay.players],
+        )
+        self.assertEqual(game.current_player_index, replay.current_player_index)
+        self.assertEqual(game.winner.name, replay.winner.name)
+        self.assertEqual(game.deck.order, replay.deck.order)
+        self.assertEqual(game.deck.cursor, replay.deck.cursor)
+
+        seqs = [event.seq for event in game.events]
+        self.assertEqual(seqs, list(range(seqs[0], seqs[0] + len(seqs))))
+        self.assertEqual([e.kind for e in game.events].count("win"), 1)
+
+    def test_autoplay_and_draws_interleave_safely(self):
+        def play(client, results):
+            for i in range(10):
+                if i % 3 == 0:
+                    response = client.post("/autoplay", json={"turns": 2})
+                    results["turns"] += response.get_json()["summary"]["turns"]
+                else:
+                    response = client.post(
+                        "/draw", headers={"Accept": "application/json"}
+                    )
+                    results["turns"] += response.status_code == 200
+
+        results = self.hammer(play)
+        self.assertEqual(results["turns"], self.game.turn_count)
+        names = [p.name for p in self.game.players]
+        replay = Game.replay(names, self.game.seed, self.game.turn_count)
+        self.assertEqual(
+            [p.position for p in self.game.players],
+            [p.position for p in replay.players],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,11 @@
 import unittest
-from app import Game, COLORS, PICTURE_CARDS
+from app import CARDS, COLORS, PICTURE_CARDS, EventLog, Game
+
 
 class TestCandylandGame(unittest.TestCase):
     def setUp(self):
         # Create a game with 2 players for testing.
-        self.game = Game(2)
+        self.game = Game(2, ["Alice", "Bob"])
 
     def test_initial_positions(self):
         # All players start at position 0.
@@ -16,8 +17,8 @@ class TestCandylandGame(unittest.TestCase):
         player = self.game.get_current_player()
         # Create a single red card and move player manually.
         card = type("TestCard", (), {})()  # dummy card object
-        card.card_type = 'single'
-        card.value = 'red'
+        card.card_type = "single"
+        card.value = "red"
         orig_pos = player.position
         self.game.move_player(player, card)
         # Ensure player position is increased.
@@ -28,7 +29,7 @@ class TestCandylandGame(unittest.TestCase):
         # Find a picture card value from the list:
         picture = PICTURE_CARDS[0]  # "Peppermint Forest"
         card = type("TestCard", (), {})()
-        card.card_type = 'picture'
+        card.card_type = "picture"
         card.value = picture
         self.game.move_player(player, card)
         # Check that player's position matches the designated picture square.
@@ -47,10 +48,228 @@ class TestCandylandGame(unittest.TestCase):
         # Assume board square 120 is a lose-turn square.
         player.position = 119
         dummy_card = type("TestCard", (), {})()
-        dummy_card.card_type = 'single'
+        dummy_card.card_type = "single"
         dummy_card.value = self.game.board.spaces[120].color
         self.game.move_player(player, dummy_card)
         self.assertTrue(player.skip_turn)
 
+    def test_color_jumps_match_linear_scan(self):
+        board = self.game.board.spaces
+        for color in COLORS:
+            for needed in (1, 2):
+                for pos in range(len(board)):
+                    expected = board[-1].index
+                    found = 0
+                    for p in range(pos + 1, len(board)):
+                        if not board[p].is_finish and board[p].color == color:
+                            found += 1
+                            if found == needed:
+                                expected = p
+                                break
+                    self.assertEqual(
+                        self.game.board.color_jumps[color][needed - 1][pos], expected
+                    )
+
+    def test_color_card_falls_through_to_finish(self):
+        player = self.game.get_current_player()
+        player.position = len(self.game.board.spaces) - 2
+        card = type("TestCard", (), {})()
+        card.card_type = "double"
+        card.value = "blue"
+        self.game.move_player(player, card)
+        self.assertEqual(player.position, self.game.board.spaces[-1].index)
+        self.assertEqual(self.game.status, "Finished")
+
+    def test_deck_reshuffles_after_every_card_is_drawn(self):
+        deck = self.game.deck
+        for _ in range(3):
+            codes = [deck.draw_code() for _ in range(len(deck.cards))]
+            self.assertEqual(sorted(codes), list(range(len(deck.cards))))
+
+    def test_last_card_uses_shared_card_table(self):
+        self.assertIsNone(self.game.last_card)
+        card = self.game.play_turn()
+        self.assertIs(self.game.last_card, card)
+        self.assertIs(card, CARDS[self.game.last_card_code])
+
+    def test_games_share_frozen_default_board(self):
+        other = Game(3, ["A", "B", "C"])
+        self.assertIs(self.game.board, other.board)
+        with self.assertRaises(AttributeError):
+            self.game.board.spaces[10].color = "blue"
+
+    def test_event_log_is_bounded_and_pages_by_cursor(self):
+        log = EventLog(capacity=5)
+        for i in range(12):
+            log.append("draw", f"event {i}")
+        self.assertEqual(len(log), 5)
+        self.assertEqual([e.seq for e in log.recent(2)], [10, 11])
+
+        page, cursor = log.page(limit=3)
+        self.assertEqual([e.seq for e in page], [9, 10, 11])
+        self.assertEqual(cursor, 9)
+        page, cursor = log.page(before=cursor, limit=3)
+        self.assertEqual([e.seq for e in page], [7, 8])
+        self.assertIsNone(cursor)
+
+    def test_turns_record_structured_events(self):
+        while self.game.status != "Finished":
+            self.game.play_turn()
+        kinds = [event.kind for event in self.game.events]
+        self.assertIn("move", kinds)
+        self.assertEqual(kinds[-1], "win")
+        self.assertEqual(self.game.messages[-1], self.game.events.recent(1)[0].text)
+
+    def test_history_renders_the_same_messages_as_live_events(self):
+        verbose = Game(3, ["A", "B", "C"], seed=7)
+        verbose.events = EventLog(capacity=10000, render=verbose.render_event)
+        while verbose.status != "Finished":
+            verbose.play_turn()
+        texts = [e.text for e in verbose.events if e.kind != "skip_reset"]
+        self.assertEqual(verbose.messages, texts)
+        self.assertIn("skip", [e.kind for e in verbose.events])
+
+        quiet = Game(3, ["A", "B", "C"], seed=7)
+        quiet.autoplay()
+        self.assertEqual(quiet.history.to_bytes(), verbose.history.to_bytes())
+        self.assertEqual(quiet.messages, verbose.messages)
+        self.assertEqual(quiet.history.nbytes, 7 * len(quiet.history))
+        self.assertEqual(list(quiet.history[-1:]), [quiet.last_turn])
+        self.assertEqual(quiet.turn_messages(-1)[-1], texts[-1])
+
+    def test_event_log_renders_turns_from_the_history(self):
+        game = Game(2, ["Alice", "Bob"], seed=34)
+        snapshots = []
+        for _ in range(10):
+            snapshots.append(game.snapshot())
+            game.play_turn()
+        self.assertEqual([e.text for e in game.events], game.messages)
+        self.assertFalse(game.events._plain)  # only codes, no text kept
+        before = [e.text for e in game.events]
+
+        # Rewinding rewrites the history past turn 5; events already in the
+        # log keep what they said, and new turns are logged after them.
+        game.restore(snapshots[5])
+        game.branch().autoplay()
+        game.play_turn()
+        texts = [e.text for e in game.events]
+        self.assertEqual(texts[: len(before)], before)
+        self.assertEqual(texts[len(before) :], game.turn_messages(-1))
+
+    def test_autoplay_finishes_quietly(self):
+        summary = self.game.autoplay()
+        self.assertEqual(self.game.status, "Finished")
+        self.assertEqual(summary["winner"], self.game.winner.name)
+        winner_index = self.game.players.index(self.game.winner)
+        self.assertEqual(summary["positions"][winner_index], 133)
+        self.assertLessEqual(sum(summary["cards_drawn"]), summary["turns"])
+        # No per-turn messages, only the win and the summary.
+        self.assertEqual([e.kind for e in self.game.events], ["win", "autoplay"])
+
+    def test_autoplay_matches_verbose_play(self):
+        quiet = Game(3, ["A", "B", "C"])
+        verbose = Game(3, ["A", "B", "C"])
+        verbose.deck.order[:] = quiet.deck.order
+        quiet.autoplay(max_turns=40)
+        for _ in range(40):
+            if verbose.status != "Finished":
+                verbose.play_turn()
+        self.assertEqual(
+            [p.position for p in quiet.players], [p.position for p in verbose.players]
+        )
+        self.assertEqual(quiet.current_player_index, verbose.current_player_index)
+
+    def test_seed_makes_games_reproducible(self):
+        first = Game(3, ["A", "B", "C"], seed=1234)
+        second = Game(3, ["A", "B", "C"], seed=1234)
+        self.assertEqual(first.deck.order, second.deck.order)
+        first.autoplay()
+        second.autoplay()
+        self.assertEqual(first.turn_count, second.turn_count)
+        self.assertEqual(first.winner.name, second.winner.name)
+        self.assertNotEqual(Game(2, ["A", "B"]).seed, Game(2, ["A", "B"]).seed)
+
+    def test_replay_rebuilds_game_from_seed_and_turns(self):
+        self.game.autoplay(max_turns=70)  # past at least one reshuffle
+        replayed = Game.replay(["Alice", "Bob"], self.game.seed, 70)
+        self.assertEqual(replayed.turn_count, self.game.turn_count)
+        self.assertEqual(
+            [p.position for p in replayed.players],
+            [p.position for p in self.game.players],
+        )
+        self.assertEqual(replayed.deck.order, self.game.deck.order)
+        self.assertEqual(replayed.deck.cursor, self.game.deck.cursor)
+
+    def test_restore_rewinds_to_any_snapshot(self):
+        game = Game(2, ["Alice", "Bob"], seed=34)  # reshuffles mid-game
+        snapshots = []
+        while game.status != "Finished":
+            snapshots.append(game.snapshot())
+            game.play_turn(quiet=True)
+        self.assertEqual(game.deck.shuffles, 2)
+        final = game.snapshot()
+        history = game.history.to_bytes()
+
+        version = game.version
+        game.restore(snapshots[10])  # before the reshuffle
+        self.assertEqual(game.version, version + 1)  # never goes backwards
+        self.assertEqual(game.turn_count, 10)
+        self.assertEqual(game.status, "InProgress")
+        self.assertIsNone(game.winner)
+        self.assertEqual(len(game.history), snapshots[10].history_length)
+        game.autoplay()
+        # The deck's RNG state is restored too, so play continues identically.
+        self.assertEqual(game.history.to_bytes(), history)
+        self.assertEqual(game.snapshot()[:-2], final[:-2])
+
+    def test_branch_is_independent_but_shares_immutable_state(self):
+        self.game.autoplay(max_turns=20)
+        before = self.game.snapshot()
+        events = len(self.game.events)
+        branch = self.game.branch()
+        self.assertIs(branch.board, self.game.board)
+        self.assertIs(branch.deck.cards, self.game.deck.cards)
+        self.assertIs(branch.deck.frozen(), before.deck)
+        self.assertEqual(branch.messages, self.game.messages)
+
+        branch.autoplay()
+        self.assertEqual(branch.status, "Finished")
+        self.assertEqual(self.game.snapshot(), before)
+        self.assertEqual(len(self.game.events), events)
+        with self.assertRaises(ValueError):
+            Game(2, ["Alice", "Bob"]).restore(before)
+
+    def test_branch_can_choose_the_next_card(self):
+        game = Game(2, ["Alice", "Bob"], seed=3)
+        game.autoplay(max_turns=20)
+        before = game.snapshot()
+        player_index = game.current_player_index
+        start = game.get_current_player().position
+        left = set(game.deck.order[game.deck.cursor :])
+        for code in left:
+            with self.subTest(card=game.deck.cards[code]):
+                branch = game.branch(next_card=code)
+                branch.play_turn()
+                card = branch.deck.cards[code]
+                landing = branch.card_target(start, card)
+                square = branch.board.spaces[landing]
+                expected = (
+                    square.shortcut_target if square.is_shortcut_start else landing
+                )
+                self.assertEqual(
+                    branch.last_turn[:4], (player_index, code, start, expected)
+                )
+                self.assertEqual(branch.history[-1], branch.last_turn)
+                self.assertEqual(
+                    branch.events.recent(1)[0].player,
+                    game.players[player_index].name,
+                )
+        self.assertEqual(game.snapshot(), before)
+
+        drawn = set(range(len(game.deck.cards))) - left
+        with self.assertRaises(ValueError):
+            game.branch(next_card=min(drawn))
+
+
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
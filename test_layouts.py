@@ -0,0 +1,170 @@
+import copy
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+import app as candyland
+from app import (
+    CLASSIC_LAYOUT,
+    DEFAULT_BOARD,
+    Board,
+    Game,
+    compile_layout,
+    load_layout,
+    load_layouts,
+)
+from history import TURN_LOSES_NEXT, TurnRecord
+
+TINY_LAYOUT = {
+    "name": "tiny",
+    "squares": 12,
+    "colors": ["red", "blue"],
+    "pictures": [{"square": 5, "name": "Ice Cream Sea"}],
+    "shortcuts": [[1, 4], [3, 8]],
+    "lose_turn": [2, 7],
+    "deck": {"singles": {"red": 3}, "doubles": 1, "pictures": ["Ice Cream Sea"]},
+}
+
+
+class TestBoardLayouts(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.folder = tmp.name
+
+    def write(self, filename, text):
+        path = os.path.join(self.folder, filename)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_classic_layout_matches_board_defaults(self):
+        self.assertIs(compile_layout(copy.deepcopy(CLASSIC_LAYOUT)), DEFAULT_BOARD)
+        board = Board()
+        self.assertEqual(board.digest, DEFAULT_BOARD.digest)
+        self.assertEqual(len(board.spaces), 134)
+        self.assertEqual(board.spaces[50].shortcut_target, 70)
+        self.assertTrue(board.spaces[120].is_lose_turn)
+        self.assertEqual(len(board.cards), 54)
+
+    def test_files_compile_once_per_content(self):
+        json_path = self.write("tiny.json", json.dumps(TINY_LAYOUT))
+        yaml_path = self.write("tiny.yaml", json.dumps(TINY_LAYOUT, indent=2))
+        board = load_layout(json_path)
+        self.assertIs(load_layout(yaml_path), board)
+        self.assertIs(compile_layout(copy.deepcopy(TINY_LAYOUT)), board)
+        self.assertIn(board.layout_id, candyland.compiled_layouts())
+
+    def test_custom_layout_rules(self):
+        board = compile_layout(TINY_LAYOUT)
+        self.assertEqual([c.card_type for c in board.cards].count("single"), 3)
+        self.assertEqual(len(board.cards), 3 + 2 + 1)
+        game = Game(2, ["Alice", "Bob"], board)
+        self.assertEqual(len(game.deck.order), 6)
+
+        alice = game.players[0]
+        red, double_red = board.cards[0], board.cards[3]
+        self.assertEqual(str(double_red), "Double red")
+        game.move_player(alice, red)  # lands on 1, shortcut to 4
+        self.assertEqual(alice.position, 4)
+        game.move_player(alice, double_red)  # 7 is a lose-turn square
+        self.assertEqual(alice.position, 7)
+        self.assertTrue(alice.skip_turn)
+
+        # Square 7 loses a turn without being a picture square.
+        record = TurnRecord(0, 3, 4, 7, TURN_LOSES_NEXT)
+        texts = [text for _, text, _ in game.turn_events(record)]
+        self.assertEqual(texts[-1], "Alice landed on square 7! Lose next turn.")
+
+    def test_invalid_layouts_are_rejected(self):
+        broken = {
+            "unknown key": {"colour": "red"},
+            "chained shortcut": {"shortcuts": [[1, 4], [4, 8]]},
+            "picture card off board": {
+                "deck": {"singles": 1, "pictures": ["Gumdrop Mountain"]}
+            },
+            "oversized deck": {"deck": {"singles": 200}},
+            "finish square picture": {"pictures": [{"square": 11, "name": "X"}]},
+            "pictures not a list": {"pictures": 5},
+            "lose_turn not a list": {"lose_turn": 3},
+            "shortcuts not a list": {"shortcuts": {"1": 4}},
+            "deck not a mapping": {"deck": [1]},
+            "deck pictures not a list": {"deck": {"singles": 1, "pictures": 5}},
+            "no colour cards": {"deck": {"singles": 0, "pictures": ["Ice Cream Sea"]}},
+        }
+        for problem, change in broken.items():
+            with self.subTest(problem):
+                with self.assertRaises(ValueError):
+                    compile_layout({**TINY_LAYOUT, **change})
+        for definition in ([], "tiny", None):
+            with self.subTest(definition=definition):
+                with self.assertRaises(ValueError):
+                    compile_layout(definition)
+
+    def test_load_layouts_skips_bad_files(self):
+        self.write("tiny.json", json.dumps(TINY_LAYOUT))
+        self.write("broken.json", json.dumps({"name": "broken"}))
+        self.write("list.json", "[]")
+        self.write("truncated.json", '{"name": "truncated"')
+        self.write("wrong-types.json", json.dumps({**TINY_LAYOUT, "deck": [1]}))
+        self.write("syntax.yaml", "name: [unclosed")
+        self.write("notes.txt", "ignored")
+        layouts = load_layouts(self.folder)
+        self.assertEqual(sorted(layouts), ["classic", "tiny"])
+        self.assertIs(layouts["classic"], DEFAULT_BOARD)
+
+    def test_shipped_layouts_are_valid(self):
+        self.assertIn("sugar-rush", candyland.LAYOUTS)
+        board = candyland.LAYOUTS["sugar-rush"]
+        self.assertEqual(len(board.spaces), 100)
+        game = Game(3, ["A", "B", "C"], board, seed=7)
+        game.autoplay()
+        self.assertEqual(game.winner.position, 99)
+
+    def test_start_picks_compiled_layout(self):
+        candyland.app.config["TESTING"] = True
+        client = candyland.app.test_client()
+        self.assertIn(b'value="sugar-rush"', client.get("/").data)
+        client.post("/start", data={"num_players": "2", "board": "sugar-rush"})
+        with client.session_transaction() as session:
+            game = candyland.registry.get(session["game_id"])
+        self.assertIs(game.board, candyland.LAYOUTS["sugar-rush"])
+        self.assertIn(b'data-square="99"', client.get("/game").data)
+
+        response = client.post("/start", data={"num_players": "2", "board": "nope"})
+        self.assertEqual(response.status_code, 302)
+        with client.session_transaction() as session:
+            self.assertIs(candyland.registry.get(session["game_id"]), game)
+
+    def test_picture_card_without_image_shows_its_name(self):
+        board = compile_layout(
+            {
+                "name": "chocolate",
+                "squares": 20,
+                "colors": ["red", "blue"],
+                "pictures": [{"square": 3, "name": "Chocolate Hill"}],
+                "deck": {"singles": {"red": 1}, "pictures": ["Chocolate Hill"]},
+            }
+        )
+        candyland.LAYOUTS["chocolate"] = board
+        self.addCleanup(candyland.LAYOUTS.pop, "chocolate")
+        candyland.app.config["TESTING"] = True
+        client = candyland.app.test_client()
+        client.post("/start", data={"num_players": "2", "board": "chocolate"})
+        for _ in range(20):
+            client.post("/draw")
+            card = client.get("/game/state").get_json()["last_card"]
+            if card and card["card_type"] == "picture":
+                break
+        self.assertIsNone(card["image_filename"])
+        response = client.get("/game")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'card-text-label">Chocolate Hill<', response.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
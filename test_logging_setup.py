@@ -0,0 +1,81 @@
+import json
+import logging
+import unittest
+
+import logging_setup
+from logging_setup import (
+    TURN_LOGGER,
+    DeferredQueueHandler,
+    JsonFormatter,
+    TurnSampler,
+    configure_logging,
+)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestLoggingSetup(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(configure_logging, {})
+
+    def test_sampler_keeps_fraction_of_records(self):
+        draws = iter([0.05, 0.5, 0.09, 0.95])
+        sampler = TurnSampler(0.1, rand=lambda: next(draws))
+        record = logging.makeLogRecord({})
+        self.assertEqual([sampler.filter(record) for _ in range(4)], [1, 0, 1, 0])
+        self.assertTrue(TurnSampler(1.0).filter(record))
+
+    def test_json_formatter_includes_turn_fields(self):
+        record = logging.makeLogRecord(
+            {
+                "name": TURN_LOGGER,
+                "levelname": "INFO",
+                "msg": "%s drew %s",
+                "args": ("Alice", "Single red"),
+                "turn": {"from": 0, "to": 1},
+            }
+        )
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry["message"], "Alice drew Single red")
+        self.assertEqual((entry["from"], entry["to"]), (0, 1))
+
+    def test_environment_sets_levels_and_sampling(self):
+        configure_logging(
+            {
+                "CANDYLAND_LOG_LEVEL": "warning",
+                "CANDYLAND_TURN_LOG_LEVEL": "error",
+                "CANDYLAND_TURN_LOG_SAMPLE": "0.25",
+            }
+        )
+        turn_logger = logging.getLogger(TURN_LOGGER)
+        self.assertEqual(logging.getLogger().level, logging.WARNING)
+        self.assertEqual(turn_logger.level, logging.ERROR)
+        self.assertEqual(
+            [f.rate for f in turn_logger.filters if isinstance(f, TurnSampler)],
+            [0.25],
+        )
+
+    def test_queue_mode_formats_on_listener_thread(self):
+        configure_logging({"CANDYLAND_LOG_QUEUE": "1"})
+        root = logging.getLogger()
+        self.assertIsInstance(root.handlers[0], DeferredQueueHandler)
+
+        captured = ListHandler()
+        logging_setup._listener.handlers += (captured,)
+        logging.getLogger("candyland.test").warning("queued %s", "record")
+        logging_setup.stop_listener()
+        records = [r for r in captured.records if r.name == "candyland.test"]
+        self.assertEqual([r.getMessage() for r in records], ["queued record"])
+        # The record reached the listener with its arguments still unformatted.
+        self.assertEqual(records[0].args, ("record",))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import logging
+import unittest
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional for the web app
+    np = None
+
+if np is not None:
+    from markov import finish_round_pmf, game_length
+    from simulation import MoveTables, simulate_games
+
+
+def coin_flip_tables():
+    # Two squares; one card reaches the finish, the other stays put.
+    destination = np.array([[1, 1], [0, 1]], dtype=np.int16)
+    loses_turn = np.zeros((2, 2), dtype=bool)
+    return MoveTables(destination, loses_turn, 1)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestMarkovChain(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_geometric_finish(self):
+        pmf = finish_round_pmf(coin_flip_tables())
+        self.assertAlmostEqual(pmf[0], 0.0)
+        self.assertAlmostEqual(pmf[1], 0.5)
+        self.assertAlmostEqual(pmf[2], 0.25)
+
+        result = game_length(2, coin_flip_tables())
+        # Each round ends the game with probability 3/4.
+        self.assertAlmostEqual(result.expected_rounds, 4 / 3)
+        # In turns the game ends on each card with probability 1/2.
+        self.assertAlmostEqual(result.expected_turns, 2.0)
+        # First seat: 1/2 + (1/4)(1/2) + ... = 2/3.
+        self.assertAlmostEqual(result.seat_wins[0], 2 / 3)
+        self.assertAlmostEqual(result.seat_wins[1], 1 / 3)
+
+    def test_lost_turn_costs_a_round(self):
+        destination = np.array([[1, 1]], dtype=np.int16)
+        loses_turn = np.array([[False, False]])
+        base = game_length(1, MoveTables(destination, loses_turn, 1))
+        self.assertAlmostEqual(base.expected_rounds, 1.0)
+
+        # Square 1 is a lose-turn square on the way to the finish at 2.
+        destination = np.array([[1, 2, 2]], dtype=np.int16)
+        loses_turn = np.array([[True, False, False]])
+        delayed = game_length(1, MoveTables(destination, loses_turn, 2))
+        self.assertAlmostEqual(delayed.expected_rounds, 3.0)
+        self.assertAlmostEqual(delayed.expected_turns, 2.0)  # a lost turn draws nothing
+
+    def test_default_board_distributions(self):
+        for players in range(2, 7):
+            result = game_length(players)
+            self.assertAlmostEqual(result.pmf.sum(), 1.0, places=9)
+            self.assertAlmostEqual(result.seat_wins.sum(), 1.0, places=9)
+            expected = float(np.sum(np.arange(len(result.pmf)) * result.pmf))
+            self.assertAlmostEqual(result.expected_rounds, expected, places=6)
+            # Moving first is an advantage.
+            self.assertTrue(np.all(np.diff(result.seat_wins) < 0))
+
+    def test_matches_batch_simulation_with_replacement(self):
+        # Checks the transition matrix against the real rules, which
+        # simulation.py shares with Game.play_turn.
+        num_games, players = 100_000, 4
+        result = game_length(players)
+        batch = simulate_games(num_games, players, seed=11, replacement=True)
+        stderr = batch.turns.std() / np.sqrt(num_games)
+        self.assertLess(abs(batch.turns.mean() - result.expected_turns), 4 * stderr)
+        wins = np.bincount(batch.winners, minlength=players) / num_games
+        np.testing.assert_allclose(wins, result.seat_wins, atol=0.006)
+
+        # Dealing from a shuffled deck instead changes the game measurably.
+        dealt = simulate_games(num_games, players, seed=11)
+        self.assertGreater(abs(dealt.turns.mean() - result.expected_turns), 10 * stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from metrics import MetricsRegistry
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsRegistry()
+
+    def test_histogram_renders_cumulative_buckets(self):
+        latency = self.metrics.histogram(
+            "latency_seconds", "Latency.", buckets=(0.1, 1.0), labelnames=("route",)
+        )
+        for value in (0.05, 0.5, 5):
+            latency.observe(value, "draw")
+        text = self.metrics.render()
+        self.assertIn("# TYPE latency_seconds histogram", text)
+        self.assertIn('latency_seconds_bucket{route="draw",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{route="draw",le="1.0"} 2', text)
+        self.assertIn('latency_seconds_bucket{route="draw",le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_count{route="draw"} 3', text)
+        self.assertIn('latency_seconds_sum{route="draw"} 5.55', text)
+
+    def test_counter_and_gauge(self):
+        turns = self.metrics.counter("turns_total", "Turns played.")
+        self.metrics.gauge("live_games", "Live games.", lambda: 7)
+        self.assertIn("turns_total 0\n", self.metrics.render())
+        turns.inc()
+        turns.inc(amount=4)
+        text = self.metrics.render()
+        self.assertIn("# TYPE turns_total counter", text)
+        self.assertIn("turns_total 5\n", text)
+        self.assertIn("live_games 7\n", text)
+
+    def test_label_values_are_escaped(self):
+        hits = self.metrics.counter("hits_total", "Hits.", labelnames=("path",))
+        hits.inc('say "hi"')
+        self.assertIn(r'hits_total{path="say \"hi\""} 1', self.metrics.render())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+import logging
+import os
+import tempfile
+import time
+import unittest
+
+import app as candyland
+from app import Game, compiled_layouts
+from persistence import GameStore, decode_snapshot, encode_snapshot
+
+
+def game_position(game):
+    return (
+        [(p.name, p.position, p.skip_turn) for p in game.players],
+        game.current_player_index,
+        game.status,
+        game.winner.name if game.winner else None,
+        bytes(game.deck.order),
+        game.deck.cursor,
+        game.last_card_code,
+        game.turn_count,
+        game.seed,
+    )
+
+
+class TestGameStore(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "games.db")
+        self.store = self.open_store()
+
+    def open_store(self, **kwargs):
+        store = GameStore(self.path, Game, compiled_layouts(), **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def play(self, store, game_id, game, turns):
+        for _ in range(turns):
+            if game.status == "Finished":
+                break
+            game.play_turn(quiet=True)
+            store.record_turn(game_id, game)
+
+    def test_snapshot_round_trip(self):
+        game = Game(3, ["Alice", "Bob", "Zoë"])
+        game.autoplay(10)
+        restored = decode_snapshot(encode_snapshot(game), Game, compiled_layouts())
+        self.assertEqual(game_position(restored), game_position(game))
+
+    def test_snapshot_keeps_board_layout(self):
+        board = candyland.LAYOUTS["sugar-rush"]
+        game = Game(2, ["Alice", "Bob"], board)
+        game.autoplay(30)
+        restored = decode_snapshot(encode_snapshot(game), Game, compiled_layouts())
+        self.assertIs(restored.board, board)
+        self.assertEqual(game_position(restored), game_position(game))
+        with self.assertRaises(ValueError):
+            decode_snapshot(encode_snapshot(game), Game, {})
+
+    def test_restore_replays_turn_log(self):
+        game = Game(2, ["Alice", "Bob"])
+        self.store.save_snapshot("g1", game)
+        self.play(self.store, "g1", game, 20)
+
+        ((game_id, restored),) = self.open_store().load_all()
+        self.assertEqual(game_id, "g1")
+        self.assertEqual(game_position(restored), game_position(game))
+
+    def test_restore_keeps_history_from_before_the_snapshot(self):
+        store = self.open_store(snapshot_every=8)
+        game = Game(2, ["Alice", "Bob"], seed=4)
+        store.save_snapshot("g1", game)
+        self.play(store, "g1", game, 21)  # snapshots at 8 and 16, then a tail
+
+        ((_, restored),) = self.open_store().load_all()
+        self.assertEqual(len(restored.history), len(game.history))
+        self.assertEqual(restored.history.to_bytes(), game.history.to_bytes())
+        self.assertEqual(restored.messages, game.messages)
+
+    def test_tail_replays_across_reshuffle(self):
+        game = Game(2, ["Alice", "Bob"])
+        game.deck.cursor = len(game.deck.order) - 1
+        self.store.save_snapshot("g1", game)
+        self.play(self.store, "g1", game, 2)
+        self.assertEqual(game.deck.shuffles, 2)
+
+        ((_, restored),) = self.open_store().load_all()
+        self.assertEqual(game_position(restored), game_position(game))
+
+    def test_finished_games_and_deletes(self):
+        finished = Game(2, ["Alice", "Bob"])
+        self.store.save_snapshot("done", finished)
+        self.play(self.store, "done", finished, 10_000)
+        self.store.save_snapshot("gone", Game(2, ["Carol", "Dan"]))
+        self.store.delete("gone")
+
+        restored = dict(self.open_store().load_all())
+        self.assertEqual(list(restored), ["done"])
+        self.assertEqual(restored["done"].winner.name, finished.winner.name)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork")
+    def test_forked_worker_gets_its_own_connection(self):
+        game = Game(2, ["Alice", "Bob"])
+        self.store.save_snapshot("parent", game)
+        pid = os.fork()
+        if pid == 0:
+            try:
+                self.store.save_snapshot("child", Game(2, ["Carol", "Dan"]))
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        self.store.save_snapshot("parent", game)
+        self.assertEqual(
+            sorted(game_id for game_id, _ in self.open_store().load_all()),
+            ["child", "parent"],
+        )
+
+    def test_bulk_restore_is_fast(self):
+        store = self.open_store(snapshot_every=16)
+        games = {}
+        for i in range(2000):
+            game = Game(4, ["A", "B", "C", "D"])
+            store.save_snapshot(f"g{i}", game)
+            self.play(store, f"g{i}", game, 25)
+            games[f"g{i}"] = game
+
+        started = time.perf_counter()
+        restored = self.open_store().load_all()
+        elapsed = time.perf_counter() - started
+        self.assertEqual(len(restored), 2000)
+        for game_id, game in restored:
+            self.assertEqual(game_position(game), game_position(games[game_id]))
+        self.assertLess(elapsed, 2.0)
+
+
+class TestPersistentRoutes(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "games.db")
+        candyland.app.config["TESTING"] = True
+        self.addCleanup(setattr, candyland, "store", None)
+
+    def test_games_survive_restart(self):
+        candyland.open_store(self.path)
+        client = candyland.app.test_client()
+        client.post("/start", data={"num_players": "2", "player1": "Alice"})
+        for _ in range(5):
+            client.post("/draw")
+        before = client.get("/game/state").get_json()
+        history = client.get("/game/history").get_json()
+        with client.session_transaction() as session:
+            game_id = session["game_id"]
+        candyland.store.close()
+
+        candyland.registry.discard(game_id)
+        candyland.open_store(self.path)
+        self.addCleanup(candyland.store.close)
+        self.assertEqual(client.get("/game/state").get_json(), before)
+        self.assertEqual(client.get("/game/history").get_json(), history)
+
+    def test_overlong_names_are_rejected_before_saving(self):
+        candyland.open_store(self.path)
+        self.addCleanup(candyland.store.close)
+        client = candyland.app.test_client()
+        longest = "🍭" * candyland.MAX_NAME_LENGTH  # 200 bytes of UTF-8
+        response = client.post(
+            "/start", data={"num_players": "2", "player1": "A" * 300}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(client.get("/game/state").status_code, 404)
+        client.post("/start", data={"num_players": "2", "player1": longest})
+        state = client.get("/game/state").get_json()
+        self.assertEqual(state["players"][0]["name"], longest)
+        reopened = GameStore(self.path, Game, compiled_layouts())
+        self.addCleanup(reopened.close)
+        ((_, restored),) = reopened.load_all()
+        self.assertEqual(restored.players[0].name, longest)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import threading
+import unittest
+
+import app as candyland
+from registry import GameRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestGameRegistry(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.registry = GameRegistry(max_games=2, ttl_seconds=60, clock=self.clock)
+
+    def test_add_and_get(self):
+        game_id = self.registry.add("game-a")
+        self.assertEqual(self.registry.get(game_id), "game-a")
+        self.assertIsNone(self.registry.get("missing"))
+        self.assertIsNone(self.registry.get(None))
+
+    def test_evicts_least_recently_used(self):
+        first = self.registry.add("game-a")
+        second = self.registry.add("game-b")
+        self.registry.get(first)  # touch, so second becomes the LRU entry
+        third = self.registry.add("game-c")
+        self.assertEqual(len(self.registry), 2)
+        self.assertIn(first, self.registry)
+        self.assertNotIn(second, self.registry)
+        self.assertIn(third, self.registry)
+
+    def test_idle_games_expire(self):
+        game_id = self.registry.add("game-a")
+        self.clock.now = 61
+        self.assertIsNone(self.registry.get(game_id))
+        self.assertEqual(len(self.registry), 0)
+
+    def test_purge_expired(self):
+        self.registry.add("game-a")
+        self.clock.now = 30
+        fresh = self.registry.add("game-b")
+        self.clock.now = 61
+        self.assertEqual(self.registry.purge_expired(), 1)
+        self.assertIn(fresh, self.registry)
+
+    def test_wait_returns_when_game_is_discarded(self):
+        game_id = self.registry.add("game-a")
+        threading.Timer(0.05, self.registry.discard, [game_id]).start()
+        self.assertFalse(self.registry.wait(game_id, lambda: False, timeout=5))
+
+    def test_wait_sees_notified_change(self):
+        game_id = self.registry.add("game-a")
+        changed = []
+
+        def change():
+            changed.append(True)
+            self.registry.notify(game_id)
+
+        threading.Timer(0.05, change).start()
+        self.assertTrue(self.registry.wait(game_id, lambda: bool(changed), timeout=5))
+
+
+class TestSessionGames(unittest.TestCase):
+    def setUp(self):
+        candyland.app.config["TESTING"] = True
+
+    def start_game(self, client, *names):
+        form = {"num_players": str(len(names))}
+        for i, name in enumerate(names, start=1):
+            form[f"player{i}"] = name
+        return client.post("/start", data=form)
+
+    def test_sessions_do_not_share_games(self):
+        alice = candyland.app.test_client()
+        bob = candyland.app.test_client()
+        self.start_game(alice, "Alice", "Ann")
+        self.start_game(bob, "Bob", "Ben")
+
+        # A new visitor landing on the setup page must not wipe other games.
+        candyland.app.test_client().get("/")
+
+        self.assertIn(b"Alice", alice.get("/game").data)
+        self.assertIn(b"Bob", bob.get("/game").data)
+        self.assertEqual(alice.post("/draw").status_code, 302)
+
+    def test_reset_discards_only_own_game(self):
+        alice = candyland.app.test_client()
+        bob = candyland.app.test_client()
+        self.start_game(alice, "Alice", "Ann")
+        self.start_game(bob, "Bob", "Ben")
+        alice.post("/reset")
+        self.assertEqual(alice.get("/game").status_code, 302)
+        self.assertEqual(bob.get("/game").status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,322 @@
+import gc
+import gzip
+import logging
+import tempfile
+import unittest
+
+import app as candyland
+
+
+class RouteTestCase(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        candyland.app.config["TESTING"] = True
+        self.client = candyland.app.test_client()
+
+    def start_game(self, *names):
+        form = {"num_players": str(len(names))}
+        for i, name in enumerate(names, start=1):
+            form[f"player{i}"] = name
+        return self.client.post("/start", data=form)
+
+
+class TestBoardRendering(RouteTestCase):
+    def test_board_fragment_is_rendered_once_per_layout(self):
+        self.start_game("Alice", "Bob")
+        self.client.get("/game")
+        with candyland.app.test_request_context():
+            first = candyland.board_fragment(candyland.DEFAULT_BOARD)
+            second = candyland.board_fragment(candyland.DEFAULT_BOARD)
+        self.assertIs(first, second)
+        self.assertIn('data-square="133"', first)
+        self.assertNotIn('class="pawn"', first)
+
+    def test_state_endpoint_reports_pawns(self):
+        self.assertEqual(self.client.get("/game/state").status_code, 404)
+        self.start_game("Alice", "Bob")
+        self.client.post("/draw")
+        state = self.client.get("/game/state").get_json()
+        self.assertEqual([p["name"] for p in state["players"]], ["Alice", "Bob"])
+        self.assertEqual(state["current_player"], 1)
+        self.assertGreater(state["players"][0]["position"], 0)
+        self.assertIsNotNone(state["last_card"])
+        self.assertEqual(state["status"], "InProgress")
+
+    def test_start_with_seed_replays_game(self):
+        self.client.post(
+            "/start", data={"num_players": "2", "player1": "Alice", "seed": "42"}
+        )
+        for _ in range(3):
+            self.client.post("/draw")
+        state = self.client.get("/game/state").get_json()
+        self.assertEqual((state["seed"], state["turn_count"]), (42, 3))
+
+        other = candyland.app.test_client()
+        other.post(
+            "/start",
+            data={"num_players": "2", "player1": "Alice", "seed": "42", "turns": "3"},
+        )
+        self.assertEqual(other.get("/game/state").get_json(), state)
+        response = other.post("/start", data={"num_players": "2", "seed": "x"})
+        self.assertEqual(response.status_code, 302)
+        # Bad input leaves the current game alone.
+        self.assertEqual(other.get("/game/state").get_json(), state)
+
+    def test_pages_use_versioned_assets_with_immutable_caching(self):
+        self.start_game("Alice", "Bob")
+        page = self.client.get("/game").get_data(as_text=True)
+        header = candyland.assets.url_name("images/colorful-candyland-header.png")
+        self.assertIn(f'src="/assets/{header}"', page)
+        self.assertNotIn('src="static/', page)
+
+        css = candyland.assets.url_name("css/style.css")
+        response = self.client.get(
+            f"/assets/{css}", headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        response = self.client.get(f"/assets/{header}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("max-age=31536000", response.headers["Cache-Control"])
+        response.close()
+        self.assertEqual(self.client.get("/assets/css/style.css").status_code, 404)
+
+
+class TestLiveUpdates(RouteTestCase):
+    def draw_json(self):
+        return self.client.post("/draw", headers={"Accept": "application/json"})
+
+    def test_json_draw_returns_turn_delta(self):
+        self.start_game("Alice", "Bob")
+        delta = self.draw_json().get_json()
+        self.assertEqual(delta["events"][0]["kind"], "draw")
+        self.assertEqual(delta["events"][0]["player"], "Alice")
+        self.assertEqual(delta["state"]["current_player"], 1)
+
+    def test_json_draw_without_game(self):
+        self.assertEqual(self.draw_json().status_code, 404)
+
+    def test_stream_replays_events_after_cursor(self):
+        self.start_game("Alice", "Bob")
+        while True:
+            delta = self.draw_json().get_json()
+            if delta["state"]["status"] == "Finished":
+                break
+        # A finished game's stream sends what is left and then closes.
+        response = self.client.get("/game/stream?after=0")
+        self.assertEqual(response.mimetype, "text/event-stream")
+        body = response.get_data(as_text=True)
+        self.assertNotIn("id: 0\n", body)
+        self.assertIn("id: 1\n", body)
+        self.assertIn('"kind": "win"', body)
+        self.assertEqual(self.draw_json().status_code, 409)
+
+    def test_spectator_can_watch_by_game_id(self):
+        self.start_game("Alice", "Bob")
+        with self.client.session_transaction() as session:
+            game_id = session["game_id"]
+        spectator = candyland.app.test_client()
+        page = spectator.get(f"/game?game_id={game_id}")
+        self.assertEqual(page.status_code, 200)
+        self.assertNotIn(b'id="draw-form"', page.data)
+        state = spectator.get(f"/game/state?game_id={game_id}").get_json()
+        self.assertEqual(state["players"][0]["name"], "Alice")
+
+    def test_autoplay_route_returns_summary(self):
+        self.start_game("Alice", "Bob")
+        response = self.client.post("/autoplay", json={"turns": 5})
+        body = response.get_json()
+        self.assertEqual(body["summary"]["turns"], 5)
+        self.assertIn("players", body["state"])
+        body = self.client.post("/autoplay", json={}).get_json()
+        self.assertEqual(body["state"]["status"], "Finished")
+        self.assertEqual(
+            self.client.post("/autoplay", json={"turns": 0}).status_code, 400
+        )
+
+    def test_history_route_exports_records_and_messages(self):
+        self.start_game("Alice", "Bob")
+        self.client.post("/autoplay", json={"turns": 10})
+        body = self.client.get("/game/history?start=8").get_json()
+        self.assertGreaterEqual(body["total"], 10)
+        self.assertEqual(len(body["turns"]), body["total"] - 8)
+        self.assertEqual(len(body["turns"][0]), 5)
+        body = self.client.get("/game/history?limit=1&text=1").get_json()
+        self.assertEqual(body["turns"][0][0], 0)
+        self.assertTrue(body["messages"][0].startswith("Alice drew: "))
+
+
+class TestConditionalGamePage(RouteTestCase):
+    def test_unchanged_page_is_answered_with_304(self):
+        self.start_game("Alice", "Bob")
+        page = self.client.get("/game")
+        etag = page.headers["ETag"]
+        self.assertEqual(page.headers["Cache-Control"], "private, no-cache")
+        self.assertNotIn("W/", etag)
+
+        renders = candyland.render_seconds.count("game.html")
+        again = self.client.get("/game", headers={"If-None-Match": etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.data, b"")
+        self.assertEqual(again.headers["ETag"], etag)
+        self.assertEqual(candyland.render_seconds.count("game.html"), renders)
+
+        self.client.post("/draw")
+        changed = self.client.get("/game", headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], etag)
+
+    def test_full_pages_are_compressed_with_their_own_etag(self):
+        self.start_game("Alice", "Bob")
+        plain = self.client.get("/game")
+        packed = self.client.get("/game", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(packed.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", packed.headers["Vary"])
+        self.assertEqual(gzip.decompress(packed.data), plain.data)
+        self.assertNotEqual(packed.headers["ETag"], plain.headers["ETag"])
+
+
+class TestBulkApi(RouteTestCase):
+    def create(self, *specs):
+        return self.client.post("/api/games", json={"games": list(specs)})
+
+    def test_create_and_advance_many_games(self):
+        response = self.create(
+            {"players": ["Ann", "Ben"], "seed": 5},
+            {"players": ["Cat", "", "Dan"]},
+        )
+        self.assertEqual(response.status_code, 201)
+        games = response.get_json()["games"]
+        self.assertEqual(games[0]["state"]["seed"], 5)
+        self.assertEqual(games[1]["state"]["players"][1]["name"], "Player 2")
+        first, second = (game["game_id"] for game in games)
+        tokens = {game["game_id"]: game["token"] for game in games}
+
+        body = self.client.post(
+            "/api/games/turns",
+            json={"turns": {first: 3, second: 500, "nope": 1}, "tokens": tokens},
+        ).get_json()["games"]
+        self.assertEqual(body[first]["turn_count"], 3)
+        self.assertEqual(len(body[first]["positions"]), 2)
+        self.assertGreaterEqual(len(body[first]["turns"]), 3)
+        self.assertEqual(body[second]["status"], "Finished")
+        self.assertIsNotNone(body[second]["winner"])
+        self.assertIn("error", body["nope"])
+        # Watchers of the game hear about the quiet turns.
+        events = self.client.get(f"/game/events?game_id={first}").get_json()["events"]
+        self.assertEqual(events[-1]["kind"], "autoplay")
+        self.assertEqual(events[-1]["text"], "Autoplayed 3 turns.")
+
+        # Same seed, same game as one played turn by turn.
+        expected = candyland.Game(2, ["Ann", "Ben"], seed=5)
+        for _ in range(3):
+            expected.play_turn(quiet=True)
+        self.assertEqual(
+            body[first]["turns"], [list(record) for record in expected.history]
+        )
+        again = self.client.post(
+            "/api/games/turns", json={"turns": {second: 1}, "tokens": tokens}
+        )
+        self.assertIn("finished", again.get_json()["games"][second]["error"])
+
+    def test_browser_games_cannot_be_advanced(self):
+        self.start_game("Alice", "Bob")
+        with self.client.session_transaction() as session:
+            game_id = session["game_id"]
+        # Anyone given the spectator URL knows the id, but has no token.
+        spectator = candyland.app.test_client()
+        for tokens in ({}, {game_id: "0" * 64}, {game_id: "é"}):
+            with self.subTest(tokens=tokens):
+                body = spectator.post(
+                    "/api/games/turns",
+                    json={"turns": {game_id: 10000}, "tokens": tokens},
+                ).get_json()["games"]
+                self.assertIn("error", body[game_id])
+        state = self.client.get("/game/state").get_json()
+        self.assertEqual((state["turn_count"], state["status"]), (0, "InProgress"))
+
+    def test_invalid_batches_are_rejected_whole(self):
+        for games in (
+            [],
+            [{"players": ["Solo"]}],
+            [{"players": ["A", "B"], "seed": -1}],
+            [{"players": ["A" * 300, "B"]}],
+        ):
+            with self.subTest(games=games):
+                response = self.client.post("/api/games", json={"games": games})
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            self.client.post("/api/games/turns", json={"turns": {"x": 0}}).status_code,
+            400,
+        )
+
+
+class TestMetricsRoute(RouteTestCase):
+    def test_metrics_track_requests_turns_and_renders(self):
+        turns_before = candyland.turns_played.value()
+        draws_before = candyland.play_turn_seconds.count()
+        self.start_game("Alice", "Bob")
+        self.client.get("/game")
+        self.client.post("/draw")
+        self.client.post("/autoplay", json={"turns": 3})
+        self.assertEqual(candyland.turns_played.value(), turns_before + 4)
+        self.assertEqual(candyland.play_turn_seconds.count(), draws_before + 1)
+
+        response = self.client.get("/metrics")
+        self.assertTrue(response.mimetype.startswith("text/plain"))
+        text = response.get_data(as_text=True)
+        self.assertIn(
+            'candyland_request_seconds_count{endpoint="draw",method="POST"}', text
+        )
+        self.assertIn(
+            'candyland_render_template_seconds_count{template="game.html"}', text
+        )
+        self.assertIn("candyland_live_games ", text)
+        self.assertIn("candyland_games_started_total ", text)
+
+
+class TestAppFactory(RouteTestCase):
+    def test_create_app_configures_and_warms_up(self):
+        registry = candyland.registry
+        self.addCleanup(setattr, registry, "max_games", registry.max_games)
+        self.addCleanup(setattr, registry, "ttl_seconds", registry.ttl_seconds)
+        self.addCleanup(gc.unfreeze)
+        candyland._board_fragments.clear()
+
+        app = candyland.create_app(
+            {
+                "TESTING": True,
+                "CANDYLAND_MAX_GAMES": "50",
+                "CANDYLAND_LOG_LEVEL": "INFO",
+            }
+        )
+        self.assertIs(app, candyland.app)
+        self.assertEqual(registry.max_games, 50)
+        for board in candyland.LAYOUTS.values():
+            self.assertIn(board, candyland._board_fragments)
+        timings = app.config["STARTUP_TIMINGS"]
+        self.assertGreater(timings["total"], timings["warm_up"])
+        self.assertGreater(gc.get_freeze_count(), 0)
+        self.assertIn("candyland_startup_seconds ", self.client.get("/metrics").text)
+
+    def test_config_overrides_secret_key_and_boards(self):
+        self.addCleanup(setattr, candyland.app, "secret_key", candyland.app.secret_key)
+        self.addCleanup(setattr, candyland, "BOARDS_DIR", candyland.BOARDS_DIR)
+        layouts = dict(candyland.LAYOUTS)
+        self.addCleanup(candyland.LAYOUTS.update, layouts)
+        self.addCleanup(candyland.LAYOUTS.clear)
+        self.addCleanup(gc.unfreeze)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+
+        candyland.create_app(
+            {"CANDYLAND_SECRET_KEY": "not-the-default", "CANDYLAND_BOARDS": tmp.name}
+        )
+        self.assertEqual(candyland.app.secret_key, "not-the-default")
+        self.assertEqual(list(candyland.LAYOUTS), ["classic"])
+        self.assertNotIn(b'value="sugar-rush"', self.client.get("/").data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import logging
+import random
+import unittest
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional for the web app
+    np = None
+
+from app import Game, Player
+
+if np is not None:
+    from simulation import build_move_tables, simulate_games
+
+
+def play_object_model(num_games, num_players):
+    turns, winners = [], []
+    for _ in range(num_games):
+        game = Game(num_players, [f"P{i}" for i in range(num_players)])
+        count = 0
+        while game.status != "Finished":
+            game.play_turn()
+            count += 1
+        turns.append(count)
+        winners.append(game.players.index(game.winner))
+    return np.array(turns), np.array(winners)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestBatchSimulation(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_move_tables_match_move_player(self):
+        game = Game(2, ["A", "B"])
+        cards = game.deck.cards
+        tables = build_move_tables()
+        for code in range(len(cards)):
+            for pos in range(len(game.board.spaces) - 1):
+                player = Player(1, "#000", "A")
+                player.position = pos
+                game.status = "InProgress"
+                game.move_player(player, cards[code])
+                self.assertEqual(tables.destination[code, pos], player.position)
+                self.assertEqual(tables.loses_turn[code, pos], player.skip_turn)
+
+    def test_deterministic_with_seed(self):
+        first = simulate_games(500, 3, seed=7)
+        second = simulate_games(500, 3, seed=7)
+        self.assertTrue((first.turns == second.turns).all())
+        self.assertTrue((first.winners == second.winners).all())
+
+    def test_statistically_equivalent_to_game_model(self):
+        random.seed(1234)
+        num_games, num_players = 1500, 3
+        model_turns, model_winners = play_object_model(num_games, num_players)
+        batch = simulate_games(20_000, num_players, seed=1234)
+
+        # Mean game length within four standard errors of the model's mean.
+        stderr = np.sqrt(
+            model_turns.var() / num_games + batch.turns.var() / len(batch.turns)
+        )
+        self.assertLess(abs(model_turns.mean() - batch.turns.mean()), 4 * stderr)
+
+        # Seat win shares agree to within a few percentage points.
+        model_share = np.bincount(model_winners, minlength=num_players) / num_games
+        batch_share = np.bincount(batch.winners, minlength=num_players) / len(
+            batch.winners
+        )
+        self.assertLess(np.abs(model_share - batch_share).max(), 0.05)
+
+        # Turn-count distributions agree on their quartiles.
+        for q in (25, 50, 75):
+            self.assertLessEqual(
+                abs(np.percentile(model_turns, q) - np.percentile(batch.turns, q)),
+                0.15 * np.percentile(model_turns, q) + 1,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+import logging
+import os
+import tempfile
+import unittest
+
+import app as candyland
+from app import Game, compiled_layouts
+from history import TURN_SKIPPED
+from registry import GameRegistry
+from statestore import MemoryStateStore, SQLiteStateStore, VersionConflict
+
+
+def play_quietly(game):
+    game.play_turn(quiet=True)
+    return game.turn_count
+
+
+class TestSQLiteStateStore(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "state.db")
+        self.store = self.open_store()
+
+    def open_store(self, **kwargs):
+        store = SQLiteStateStore(self.path, Game, compiled_layouts(), **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_updates_are_visible_to_other_workers(self):
+        game_id = self.store.add(Game(2, ["Alice", "Bob"], seed=3))
+        other = self.open_store()
+        first = other.get(game_id)
+        self.assertIs(other.get(game_id), first)  # unchanged, so cached
+
+        for _ in range(5):
+            self.store.update(game_id, lambda game: game.play_turn())
+        loaded = other.get(game_id)
+        self.assertIsNot(loaded, first)
+        self.assertEqual(loaded.turn_count, 5)
+        self.assertEqual(len(loaded.history), len(self.store.get(game_id).history))
+        # Both workers rebuild the same event feed from the history.
+        self.assertEqual(
+            [e.text for e in loaded.events],
+            [e.text for e in self.store.get(game_id).events],
+        )
+        self.assertTrue(other.discard(game_id))
+        self.assertIsNone(self.store.get(game_id))
+        with self.assertRaises(KeyError):
+            self.store.update(game_id, play_quietly)
+
+    def test_lost_race_is_retried_on_fresh_state(self):
+        game_id = self.store.add(Game(2, ["Alice", "Bob"]))
+        other = self.open_store()
+        attempts = []
+
+        def mutate(game):
+            attempts.append(game.turn_count)
+            if len(attempts) == 1:
+                other.update(game_id, play_quietly)  # another worker wins
+            return play_quietly(game)
+
+        self.assertEqual(self.store.update(game_id, mutate), 2)
+        self.assertEqual(attempts, [0, 1])
+        self.assertEqual(self.store.conflicts, 1)
+
+        impatient = self.open_store(retries=1)
+
+        def always_loses(game):
+            other.update(game_id, play_quietly)
+            return play_quietly(game)
+
+        with self.assertRaises(VersionConflict):
+            impatient.update(game_id, always_loses)
+
+    def test_unchanged_games_are_not_written(self):
+        game_id = self.store.add(Game(2, ["Alice", "Bob"]))
+        self.store.update(game_id, play_quietly)
+        cached = self.store.get(game_id)
+        self.assertIsNone(self.store.update(game_id, lambda game: None))
+        self.assertEqual(self.store._fetch(game_id)[0], 2)
+        self.assertIs(self.store.get(game_id), cached)
+
+    def test_add_purges_idle_and_excess_games(self):
+        store = self.open_store(max_games=3, ttl_seconds=3600, purge_interval=0)
+        ids = [store.add(Game(2, ["Alice", "Bob"])) for _ in range(5)]
+        self.assertEqual(len(store), 3)
+        self.assertIsNotNone(store.get(ids[-1]))
+        with store._lock, store._db:
+            store._db.execute("UPDATE game_state SET updated_at = 0")
+        store.add(Game(2, ["Carol", "Dan"]))
+        self.assertEqual(len(store), 1)
+
+        lazy = self.open_store(max_games=1, purge_interval=3600)
+        lazy.add(Game(2, ["Eve", "Fay"]))  # the first add purges
+        lazy.add(Game(2, ["Gus", "Hal"]))  # later ones wait for the interval
+        self.assertEqual(len(lazy), 2)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork")
+    def test_concurrent_workers_never_lose_a_turn(self):
+        game_id = self.store.add(Game(6, list("ABCDEF"), seed=2))
+        workers, turns = 4, 10
+        pids = []
+        for _ in range(workers):
+            pid = os.fork()
+            if pid == 0:
+                status = 1
+                try:
+                    for _ in range(turns):
+                        self.store.update(game_id, play_quietly)
+                    status = 0
+                finally:
+                    os._exit(status)
+            pids.append(pid)
+        for pid in pids:
+            self.assertEqual(os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]), 0)
+        game = self.store.get(game_id)
+        self.assertEqual(game.turn_count, workers * turns)
+        played = [record for record in game.history if not record.flags & TURN_SKIPPED]
+        self.assertEqual(len(played), workers * turns)
+
+
+class TestMemoryStateStore(unittest.TestCase):
+    def test_update_runs_under_the_game_lock(self):
+        games = MemoryStateStore(GameRegistry())
+        game = Game(2, ["Alice", "Bob"])
+        game_id = games.add(game)
+
+        def mutate(current):
+            self.assertIs(current, game)
+            self.assertTrue(game.lock._is_owned())
+            return play_quietly(current)
+
+        self.assertEqual(games.update(game_id, mutate), 1)
+        self.assertIs(games.get(game_id), game)
+        with self.assertRaises(KeyError):
+            games.update("missing", mutate)
+
+
+class TestSharedStateRoutes(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "state.db")
+        candyland.app.config["TESTING"] = True
+        self.addCleanup(setattr, candyland, "games", candyland.games)
+
+    def test_any_worker_can_serve_the_next_draw(self):
+        candyland.open_shared_state(self.path)
+        self.addCleanup(candyland.games.close)
+        client = candyland.app.test_client()
+        client.post("/start", data={"num_players": "2", "player1": "Alice"})
+        with client.session_transaction() as session:
+            game_id = session["game_id"]
+        headers = {"Accept": "application/json"}
+        delta = client.post("/draw", headers=headers).get_json()
+        self.assertEqual(delta["events"][0]["kind"], "draw")
+
+        # A second worker process would open its own store on the same file.
+        worker = SQLiteStateStore(self.path, Game, compiled_layouts())
+        self.addCleanup(worker.close)
+        self.assertEqual(worker.get(game_id).turn_count, 1)
+        worker.update(game_id, play_quietly)
+        state = client.get("/game/state").get_json()
+        self.assertEqual(state["turn_count"], 2)
+        self.assertEqual(client.get("/game").status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,18 @@
+"""WSGI entry point for production servers, e.g.
+
+    gunicorn --preload --workers 4 wsgi:app
+
+With --preload the master imports this module once: create_app configures
+the app, compiles templates, renders the board layouts and fingerprints
+the static assets before any worker is forked, so workers start ready to
+serve and share that memory copy-on-write.
+
+Games live in each worker's memory by default, so more than one worker
+needs a store they all share:
+
+    CANDYLAND_STATE_DB=/var/tmp/candyland.db gunicorn --preload --workers 4 wsgi:app
+"""
+
+from app import create_app
+
+app = create_app()